@@ -1,11 +1,15 @@
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 
+from core.media import serve_media
+from core.metrics import metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="OPTIMA Product API",
@@ -24,8 +28,12 @@ urlpatterns = [
     path('api/v1/', include([
         path('', include(('core.urls', 'core'))),
     ])),
+    path('metrics', metrics_view, name='metrics'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Медиа отдаются и в продакшене: хешированные имена, долгий Cache-Control, Range,
+# а при MEDIA_ACCEL_REDIRECT — передача файла nginx (core/media.py)
+urlpatterns += [
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+]
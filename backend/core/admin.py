@@ -1,6 +1,15 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
+from django.db.models import Count
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Category, Type, Product, ProductImage, ProductColor
+from .models import Category, Type, Product, ProductImage, ProductColor, ImageJob
+from .colors import normalize_color, validate_color
+from .signals import invalidate_catalog
+from .images import smallest_variant
+from . import bulk
 
 # Админка для Category
 class TypeInline(admin.TabularInline):
@@ -9,42 +18,38 @@ class TypeInline(admin.TabularInline):
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('category_name', 'created_at', 'updated_at', 'type_count', 'product_count')
+    list_display = ('category_name', 'created_at', 'updated_at', 'type_count', 'product_count', 'in_stock_count')
     search_fields = ('category_name',)
     list_filter = ('created_at',)
     ordering = ('category_name',)
     inlines = [TypeInline]
 
+    def get_queryset(self, request):
+        # Число типов одним запросом вместе со страницей; счётчики продуктов — столбцы модели
+        return super().get_queryset(request).annotate(types_total=Count('type'))
+
     def type_count(self, obj):
-        return obj.type_set.count()
+        return obj.types_total
 
     type_count.short_description = 'Типов'
-
-    def product_count(self, obj):
-        return Product.objects.filter(type__category=obj).count()
-
-    product_count.short_description = 'Продуктов'
+    type_count.admin_order_field = 'types_total'
 
 # Админка для Type
 @admin.register(Type)
 class TypeAdmin(admin.ModelAdmin):
-    list_display = ('type_name', 'category', 'created_at', 'updated_at', 'product_count')
+    list_display = ('type_name', 'category', 'created_at', 'updated_at', 'product_count', 'in_stock_count')
     search_fields = ('type_name',)
     list_filter = ('category', 'created_at')
     ordering = ('type_name',)
     autocomplete_fields = ('category',)
-
-    def product_count(self, obj):
-        return obj.product_set.count()
-
-    product_count.short_description = 'Продуктов'
+    list_select_related = ('category',)
 
 # Inline для ProductImage
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 1
-    fields = ('image', 'created_at')
-    readonly_fields = ('created_at',)
+    fields = ('image', 'status', 'created_at')
+    readonly_fields = ('status', 'created_at')
 
 # Inline для ProductColor
 class ProductColorInline(admin.TabularInline):
@@ -53,12 +58,37 @@ class ProductColorInline(admin.TabularInline):
     verbose_name = "Цвет"
     verbose_name_plural = "Цвета"
 
+class ProductColorForm(forms.ModelForm):
+    def clean_color(self):
+        # До проверки уникальности, чтобы '#fff' нашёл существующий '#FFFFFF'. Неверное значение —
+        # ошибка формы: до ProductColor.save(), который бросил бы ValueError, дело не дойдёт
+        try:
+            return normalize_color(self.cleaned_data['color'])
+        except ValueError as error:
+            raise forms.ValidationError(str(error))
+
+
 # Админка для ProductColor
 @admin.register(ProductColor)
 class ProductColorAdmin(admin.ModelAdmin):
+    form = ProductColorForm
     list_display = ('color',)
     search_fields = ('color',)
 
+# Админка для очереди обработки изображений
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'image', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status',)
+    list_select_related = ('image__product',)
+    readonly_fields = ('image', 'attempts', 'locked_at', 'last_error', 'created_at', 'updated_at')
+
+# Значения для действий над выбранными продуктами, поля рядом со списком действий
+class ProductActionForm(ActionForm):
+    color = forms.CharField(label='Цвет', max_length=7, required=False, validators=[validate_color])
+    type = forms.ModelChoiceField(label='Тип', queryset=Type.objects.all(), required=False)
+
+
 # Админка для Product
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -86,6 +116,9 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).for_read()
+
     def get_category(self, obj):
         return obj.type.category.category_name if obj.type and obj.type.category else '-'
 
@@ -99,7 +132,7 @@ class ProductAdmin(admin.ModelAdmin):
     get_type.admin_order_field = 'type__type_name'
 
     def colors_display(self, obj):
-        colors = obj.colors.all()
+        colors = list(obj.colors.all())
         if colors:
             # Отображаем первый цвет как квадрат и все цвета как текст
             return format_html(
@@ -112,22 +145,71 @@ class ProductAdmin(admin.ModelAdmin):
     colors_display.allow_tags = True
 
     def image_preview(self, obj):
-        first_image = obj.images.first()
+        # images уже отсортированы по id в for_read(), first() сделал бы отдельный запрос
+        first_image = next(iter(obj.images.all()), None)
         if first_image and first_image.image:
-            return format_html('<img src="{}" style="max-height: 50px;" />', first_image.image.url)
+            # Самая маленькая производная вместо полноразмерного оригинала
+            preview = smallest_variant(first_image)
+            url = first_image.image.storage.url(preview) if preview else first_image.image.url
+            return format_html('<img src="{}" style="max-height: 50px;" />', url)
         return "Нет изображения"
 
     image_preview.short_description = 'Фото'
     image_preview.allow_tags = True
 
+    # Действия выполняются запросами на всю выборку (core/bulk.py), а не по продукту
+    action_form = ProductActionForm
+
+    def action_value(self, request, name):
+        # Поле «action» формы проверяет сама админка, здесь — только поле значения
+        field = self.action_form.base_fields[name]
+        try:
+            value = field.clean(request.POST.get(name))
+        except ValidationError:
+            value = None
+        if not value:
+            self.message_user(request, f'Укажите поле «{field.label}»', messages.ERROR)
+        return value
+
+    def report(self, request, count):
+        self.message_user(request, f'Изменено продуктов: {count}', messages.SUCCESS)
+
     @admin.action(description='Установить белый цвет (#FFFFFF)')
     def set_white_color(self, request, queryset):
-        white_color, _ = ProductColor.objects.get_or_create(color="#FFFFFF")
-        for product in queryset:
-            product.colors.set([white_color])
+        self.report(request, bulk.set_colors(queryset, ['#FFFFFF']))
+
+    @admin.action(description='Добавить цвет')
+    def add_color(self, request, queryset):
+        color = self.action_value(request, 'color')
+        if color:
+            self.report(request, bulk.add_colors(queryset, [color]))
+
+    @admin.action(description='Убрать цвет')
+    def remove_color(self, request, queryset):
+        color = self.action_value(request, 'color')
+        if color:
+            self.report(request, bulk.remove_colors(queryset, [color]))
+
+    @admin.action(description='Перенести в тип')
+    def move_to_type(self, request, queryset):
+        type_obj = self.action_value(request, 'type')
+        if type_obj:
+            self.report(request, bulk.set_type(queryset, type_obj.pk))
+
+    @admin.action(description='Отметить «в наличии»')
+    def mark_in_stock(self, request, queryset):
+        self.report(request, bulk.set_in_stock(queryset, True))
+
+    @admin.action(description='Отметить «нет в наличии»')
+    def mark_out_of_stock(self, request, queryset):
+        self.report(request, bulk.set_in_stock(queryset, False))
 
     @admin.action(description='Сбросить вес на 0')
     def reset_weight(self, request, queryset):
-        queryset.update(weight=0)
+        # update() не отправляет сигналы и не трогает auto_now: updated_at (ETag, кеш фрагментов)
+        # и версию кеша каталога обновляем сами
+        queryset.update(weight=0, updated_at=timezone.now())
+        invalidate_catalog()
 
-    actions = ['set_white_color', 'reset_weight']
\ No newline at end of file
+    actions = ['set_white_color', 'add_color', 'remove_color', 'move_to_type',
+               'mark_in_stock', 'mark_out_of_stock', 'reset_weight']
\ No newline at end of file
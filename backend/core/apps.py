@@ -5,3 +5,6 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     verbose_name = 'Основной модуль'
     name = 'core'
+
+    def ready(self):
+        from . import db, signals  # noqa: F401
@@ -0,0 +1,263 @@
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+
+from .cache import aget_catalog_version, cache_entry, cached_response, catalog_cache, is_anonymous, response_cache_key
+from .conditional import acompute_validators, conditional_response, set_validators, validators_for
+from .db import read_database
+from .engine import page_rows, select_products
+from .filters import filter_products, sort_products, ProductFilterError
+from .models import Category, Type, Product, ProductImage
+from .pagination import (
+    KeysetPaginator, InvalidCursor, page_size_param, numbered_page, cursor_data, page_data, wants_count
+)
+from .renderers import CatalogJSONRenderer
+from .representation import (
+    CATEGORY_COLUMNS, TYPE_COLUMNS, IMAGE_COLUMNS, FastProductSerializer,
+    category_representation, type_representation, image_representation,
+)
+from .serializers import product_representation
+from . import views
+
+
+class AsyncCatalogView(View):
+    """
+    Асинхронное чтение каталога для ASGI (ASYNC_CATALOG_VIEWS): анонимные GET выполняются
+    асинхронным ORM без перехода в поток синхронного адаптера на весь запрос. Ответы те же,
+    что у sync_view, и записи кеша каталога общие с ним. Запись, авторизованные клиенты
+    и Browsable API передаются sync_view.
+
+    В Django 4.2 запросы асинхронного ORM всё ещё выполняются через sync_to_async,
+    но поток занят только на время запроса к базе, а не на весь цикл DRF.
+    """
+    sync_view = None
+    # Изображения не кешируются и в синхронной версии
+    cached = True
+    delegate = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(delegate=sync_to_async(cls.sync_view.as_view()), **initkwargs)
+        # Проверку CSRF для сессий выполняет DRF в sync_view, как для APIView
+        view.csrf_exempt = True
+        return view
+
+    @staticmethod
+    def uses_drf(request):
+        accept = request.META.get('HTTP_ACCEPT', '')
+        return (request.method != 'GET' or not is_anonymous(request)
+                or 'text/html' in accept or 'indent=' in accept or 'format' in request.GET)
+
+    async def dispatch(self, request, *args, **kwargs):
+        if self.uses_drf(request):
+            return await self.delegate(request, *args, **kwargs)
+        if not self.cached:
+            return await self.handle(request, *args, **kwargs)
+
+        cache = catalog_cache()
+        key = response_cache_key(request, await aget_catalog_version())
+        entry = await cache.aget(key)
+        if entry is not None:
+            return cached_response(request, entry)
+
+        response = await self.handle(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(key, cache_entry(request, response))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    async def handle(self, request, *args, **kwargs):
+        try:
+            return await self.get(request, *args, **kwargs)
+        except Http404 as error:
+            return self.respond({"detail": str(error)}, status=404)
+        except ProductFilterError as error:
+            return self.respond({"error": str(error)}, status=400)
+
+    async def get(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def respond(self, data, status=200, validators=None):
+        response = HttpResponse(CatalogJSONRenderer().render(data), status=status, content_type='application/json')
+        # Как у DRF: от Accept зависит, JSON это или Browsable API
+        patch_vary_headers(response, ('Accept',))
+        return set_validators(response, validators) if validators is not None else response
+
+    async def conditional(self, request, queryset, missing=None):
+        """Валидаторы и 304, если тело не нужно; missing — текст 404 детального ответа для пустого queryset"""
+        validators = await acompute_validators(request, queryset)
+        if missing is not None and not validators.count:
+            raise Http404(missing)
+        return validators, conditional_response(request, validators)
+
+
+class CategoryListView(AsyncCatalogView):
+    sync_view = views.CategoryListCreateView
+
+    async def get(self, request):
+        categories = Category.objects.using(read_database())
+        validators, not_modified = await self.conditional(request, categories)
+        if not_modified is not None:
+            return not_modified
+
+        results = [category_representation(row) async for row in categories.values(*CATEGORY_COLUMNS)]
+        return self.respond({"count": len(results), "results": results}, validators=validators)
+
+
+class CategoryDetailView(AsyncCatalogView):
+    sync_view = views.CategoryDetailView
+
+    async def get(self, request, pk):
+        categories = Category.objects.using(read_database()).filter(pk=pk)
+        validators, not_modified = await self.conditional(request, categories, missing="Category not found")
+        if not_modified is not None:
+            return not_modified
+
+        row = await categories.values(*CATEGORY_COLUMNS).afirst()
+        if row is None:
+            raise Http404("Category not found")
+        return self.respond(category_representation(row), validators=validators)
+
+
+class TypeListView(AsyncCatalogView):
+    sync_view = views.TypeListCreateView
+
+    async def get(self, request):
+        types = Type.objects.using(read_database())
+        category_id = request.GET.get('category', None)
+        if category_id:
+            try:
+                types = types.filter(category__id=category_id)
+            except ValueError:
+                return self.respond({"error": "Invalid category ID"}, status=400)
+
+        validators, not_modified = await self.conditional(request, types)
+        if not_modified is not None:
+            return not_modified
+
+        results = [type_representation(row) async for row in types.values(*TYPE_COLUMNS)]
+        return self.respond({
+            "count": len(results),
+            "category_id": category_id if category_id else "All",
+            "results": results
+        }, validators=validators)
+
+
+class TypeDetailView(AsyncCatalogView):
+    sync_view = views.TypeDetailView
+
+    async def get(self, request, pk):
+        types = Type.objects.using(read_database()).filter(pk=pk)
+        validators, not_modified = await self.conditional(request, types, missing="Type not found")
+        if not_modified is not None:
+            return not_modified
+
+        row = await types.values(*TYPE_COLUMNS).afirst()
+        if row is None:
+            raise Http404("Type not found")
+        return self.respond(type_representation(row), validators=validators)
+
+
+class ProductListView(AsyncCatalogView):
+    sync_view = views.ProductListCreateView
+
+    async def get(self, request):
+        params = request.GET
+        serializer_class, fields = product_representation(params)
+        sort_field = params.get('sort') or 'id'
+        database = read_database()
+        fast = FastProductSerializer(serializer_class, fields, encoded=True, using=database)
+        if params.get('q'):
+            # Поиск проверяет наличие таблицы FTS5 синхронным запросом к схеме базы
+            products = await sync_to_async(filter_products)(Product.objects.using(database), params)
+        else:
+            products = filter_products(Product.objects.using(database), params)
+        products = sort_products(products, params)
+
+        # Движок каталога в памяти, как в синхронном представлении
+        selection = await sync_to_async(select_products)(params, database)
+        if selection is not None:
+            validators = validators_for(request, Product, selection.state)
+            not_modified = conditional_response(request, validators)
+        else:
+            validators, not_modified = await self.conditional(request, products)
+        if not_modified is not None:
+            return not_modified
+
+        rows = fast.values(products, extra=[sort_field])
+        page_size = page_size_param(params)
+
+        if 'cursor' in params:
+            paginator = KeysetPaginator(rows, page_size, sort_field=sort_field,
+                                        descending=params.get('order', 'asc') == 'desc')
+            try:
+                page_objects, next_cursor = await paginator.apage(params.get('cursor'))
+            except InvalidCursor:
+                return self.respond({"error": "Invalid cursor"}, status=400)
+
+            count = await products.acount() if wants_count(params) else None
+            data = cursor_data(params, next_cursor, await fast.aserialize(page_objects), count, page_size)
+            return self.respond(data, validators=validators)
+
+        if selection is not None:
+            page_objects = numbered_page(Paginator(selection.ids, page_size), params.get('page', 1))
+            rows = await sync_to_async(page_rows)(fast, page_objects.object_list, database, extra=[sort_field])
+        else:
+            paginator = Paginator(rows, page_size)
+            # Paginator считает строки синхронно, поэтому количество задаётся заранее
+            paginator.count = await products.acount()
+            page_objects = numbered_page(paginator, params.get('page', 1))
+            rows = page_objects.object_list
+        return self.respond(page_data(params, page_objects, await fast.aserialize(rows)), validators=validators)
+
+
+class ProductDetailView(AsyncCatalogView):
+    sync_view = views.ProductDetailView
+
+    async def get(self, request, pk):
+        database = read_database()
+        products = Product.objects.using(database).filter(pk=pk)
+        validators, not_modified = await self.conditional(request, products, missing="Product not found")
+        if not_modified is not None:
+            return not_modified
+
+        serializer_class, fields = product_representation(request.GET)
+        fast = FastProductSerializer(serializer_class, fields, encoded=True, using=database)
+        rows = await fast.aserialize(fast.values(products))
+        if not rows:
+            raise Http404("Product not found")
+        return self.respond(rows[0], validators=validators)
+
+
+class ProductImageListView(AsyncCatalogView):
+    sync_view = views.ProductImageListCreateView
+    cached = False
+
+    async def get(self, request):
+        product_id = request.GET.get('product', None)
+        images = ProductImage.objects.using(read_database())
+        if product_id:
+            images = images.filter(product_id=product_id)
+        return self.respond([image_representation(row) async for row in images.values(*IMAGE_COLUMNS)])
+
+
+class ProductImageDetailView(AsyncCatalogView):
+    sync_view = views.ProductImageDetailView
+    cached = False
+
+    async def get(self, request, pk):
+        row = await ProductImage.objects.using(read_database()).filter(pk=pk).values(*IMAGE_COLUMNS).afirst()
+        if row is None:
+            raise Http404("Product image not found")
+        return self.respond(image_representation(row))
+
+
+# Синхронное представление → асинхронное, см. catalog_view в core/urls.py
+ASYNC_VIEWS = {
+    view.sync_view: view for view in (
+        CategoryListView, CategoryDetailView, TypeListView, TypeDetailView,
+        ProductListView, ProductDetailView, ProductImageListView, ProductImageDetailView,
+    )
+}
@@ -0,0 +1,286 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .cache import bump_catalog_version
+from .colors import normalize_color
+from .counters import recount
+from .models import Product, ProductColor, Type
+from .serializers import ProductBulkItemSerializer
+
+MAX_OPERATIONS = 500
+OPERATIONS = ('create', 'update', 'delete')
+MAX_ACTION_PRODUCTS = 10000
+
+
+def _parse_operation(operation):
+    """Проверка формы операции без обращений к базе; возвращает (op, id, data) или текст ошибки"""
+    if not isinstance(operation, dict):
+        return "Operation must be an object"
+    op = operation.get('op')
+    if op not in OPERATIONS:
+        return f"Unknown op, expected one of: {', '.join(OPERATIONS)}"
+    pk = operation.get('id')
+    if op != 'create' and (not isinstance(pk, int) or isinstance(pk, bool)):
+        return "Field 'id' must be an integer"
+    data = operation.get('data')
+    if op != 'delete' and not isinstance(data, dict):
+        return "Field 'data' must be an object"
+    return op, pk, data
+
+
+def _check_unique(field, items, deleted_ids, message):
+    """
+    Один запрос на всё множество значений поля. Проверяется состояние после пакета: конфликт,
+    если значение останется у другого продукта или повторяется внутри пакета. Значения
+    удаляемых продуктов и продуктов, которым пакет задаёт новое значение поля, освобождаются.
+    """
+    values = {}
+    for index, item in items.items():
+        value = item['data'].get(field)
+        if value:
+            values.setdefault(value, []).append(index)
+
+    released = deleted_ids | {item['id'] for item in items.values() if item['op'] == 'update' and field in item['data']}
+    taken = {}
+    for value, pk in Product.objects.filter(**{f'{field}__in': list(values)}).values_list(field, 'pk'):
+        if pk not in released:
+            taken.setdefault(value, set()).add(pk)
+
+    errors = {}
+    for value, indexes in values.items():
+        for index in indexes:
+            if taken.get(value) or len(indexes) > 1:
+                errors[index] = {field: [message]}
+    return errors
+
+
+def validate_operations(operations):
+    """
+    Проверяет пакет операций: по одному запросу на существование продуктов, на типы,
+    на уникальность названий и артикулов. Возвращает (items, errors) — errors по индексам.
+    """
+    items, errors = {}, {}
+    for index, operation in enumerate(operations):
+        parsed = _parse_operation(operation)
+        if isinstance(parsed, str):
+            errors[index] = {'non_field_errors': [parsed]}
+        else:
+            op, pk, data = parsed
+            items[index] = {'op': op, 'id': pk, 'data': data}
+
+    ids = [item['id'] for item in items.values() if item['op'] != 'create']
+    products = Product.objects.in_bulk(ids)
+    seen = set()
+    for index, item in items.items():
+        if item['op'] == 'create':
+            continue
+        if item['id'] not in products:
+            errors[index] = {'id': ["Product not found"]}
+        elif item['id'] in seen:
+            errors[index] = {'id': ["Product appears in several operations"]}
+        seen.add(item['id'])
+
+    for index, item in items.items():
+        if item['op'] == 'delete' or index in errors:
+            continue
+        serializer = ProductBulkItemSerializer(data=item['data'], partial=item['op'] == 'update')
+        if serializer.is_valid():
+            item['data'] = serializer.validated_data
+        else:
+            errors[index] = serializer.errors
+
+    valid = {index: item for index, item in items.items() if index not in errors and item['op'] != 'delete'}
+    types = Type.objects.in_bulk({item['data']['type_id'] for item in valid.values() if 'type_id' in item['data']})
+    for index, item in valid.items():
+        if 'type_id' in item['data'] and item['data']['type_id'] not in types:
+            errors[index] = {'type_id': ["Type not found"]}
+
+    deleted_ids = {item['id'] for item in items.values() if item['op'] == 'delete'}
+    valid = {index: item for index, item in valid.items() if index not in errors}
+    for field, message in (('product_name', "Продукт с таким названием уже существует"),
+                           ('article_number', "Продукт с таким артикулом уже существует")):
+        for index, error in _check_unique(field, valid, deleted_ids, message).items():
+            errors.setdefault(index, {}).update(error)
+
+    for item in items.values():
+        item['product'] = products.get(item['id'])
+    return items, errors
+
+
+@transaction.atomic
+def apply_operations(items):
+    """Выполняет проверенные операции: удаления, затем вставки и обновления пачками"""
+    now = timezone.now()
+    results = {}
+
+    deleted = [item['id'] for item in items.values() if item['op'] == 'delete']
+    Product.objects.filter(pk__in=deleted).delete()
+
+    # Артикул уникален в базе и проверяется построчно: значения, которые обновления пакета
+    # освобождают, снимаем заранее, иначе обмен артикулами или их передача нарушат индекс
+    released = [item['id'] for item in items.values() if item['op'] == 'update' and 'article_number' in item['data']
+                and item['data']['article_number'] != item['product'].article_number]
+    if released:
+        Product.objects.filter(pk__in=released).update(article_number=None)
+
+    colors_by_index, to_create, to_update, update_fields = {}, [], [], {'updated_at'}
+    type_ids = set()
+    for index, item in items.items():
+        data = dict(item['data'] or {})
+        if 'colors' in data:
+            colors_by_index[index] = [color['color'] for color in data.pop('colors')]
+        if item['op'] == 'create':
+            item['product'] = Product(**data)
+            to_create.append(item['product'])
+            type_ids.add(item['product'].type_id)
+        elif item['op'] == 'update':
+            type_ids.add(item['product'].type_id)
+            for field, value in data.items():
+                setattr(item['product'], field, value)
+            item['product'].updated_at = now
+            update_fields.update(data)
+            to_update.append(item['product'])
+            type_ids.add(item['product'].type_id)
+
+    Product.objects.bulk_create(to_create)
+    if to_update:
+        Product.objects.bulk_update(to_update, sorted(update_fields))
+
+    if colors_by_index:
+        color_ids = ProductColor.objects.resolve([c for colors in colors_by_index.values() for c in colors])
+        through = Product.colors.through
+        product_ids = [items[index]['product'].pk for index in colors_by_index]
+        through.objects.filter(product_id__in=product_ids).delete()
+        through.objects.bulk_create([
+            through(product_id=items[index]['product'].pk, productcolor_id=color_ids[color])
+            for index, colors in colors_by_index.items() for color in dict.fromkeys(colors)
+        ])
+
+    # bulk-операции не отправляют сигналы: счётчики типов, поисковый индекс и кеш каталога обновляем сами
+    # (удаление выше их отправляет)
+    if type_ids:
+        recount(type_ids)
+    changed = [product.pk for product in to_create + to_update]
+    if changed and search.search_available():
+        search.index_products(Product.objects.filter(pk__in=changed))
+    transaction.on_commit(bump_catalog_version)
+
+    for index, item in items.items():
+        status = {'create': 'created', 'update': 'updated', 'delete': 'deleted'}[item['op']]
+        results[index] = {'status': status, 'id': item['product'].pk}
+    return results
+
+
+# Действия над множеством продуктов (админка и {"action": ...} в /products/bulk/): несколько
+# запросов на всё множество в одной транзакции, без сигналов. Цвета, тип и наличие не входят
+# в поисковый индекс, поэтому переиндексация не нужна; updated_at, счётчики типов и версию кеша
+# обновляем сами.
+
+def _touch(products, **fields):
+    """UPDATE по подзапросу: список id не передаётся параметрами, размер выборки не ограничен"""
+    changed = Product.objects.filter(pk__in=products.order_by().values('pk')).update(
+        updated_at=timezone.now(), **fields)
+    transaction.on_commit(bump_catalog_version)
+    return changed
+
+
+def _link_colors(product_ids, colors):
+    color_ids = ProductColor.objects.resolve(colors)
+    through = Product.colors.through
+    # Уже существующие связи пропускаются уникальным индексом (product_id, productcolor_id)
+    through.objects.bulk_create([
+        through(product_id=product_id, productcolor_id=color_id)
+        for product_id in product_ids for color_id in color_ids.values()
+    ], ignore_conflicts=True)
+
+
+# Цвета в действиях — любые hex-записи ('#fff', 'FFFFFF'), неверные — ValueError
+
+@transaction.atomic
+def set_colors(products, colors):
+    """Заменяет цвета продуктов на colors; возвращает число продуктов"""
+    colors = [normalize_color(color) for color in colors]
+    product_ids = list(products.order_by().values_list('pk', flat=True))
+    Product.colors.through.objects.filter(product_id__in=products.order_by().values('pk')).delete()
+    _link_colors(product_ids, colors)
+    return _touch(products)
+
+
+@transaction.atomic
+def add_colors(products, colors):
+    colors = [normalize_color(color) for color in colors]
+    _link_colors(products.order_by().values_list('pk', flat=True), colors)
+    return _touch(products)
+
+
+@transaction.atomic
+def remove_colors(products, colors):
+    Product.colors.through.objects.filter(
+        product_id__in=products.order_by().values('pk'),
+        productcolor_id__in=ProductColor.objects.filter(
+            color__in=[normalize_color(color) for color in colors]).values('pk'),
+    ).delete()
+    return _touch(products)
+
+
+@transaction.atomic
+def set_type(products, type_id):
+    type_ids = set(products.order_by().values_list('type_id', flat=True).distinct())
+    changed = _touch(products, type_id=type_id)
+    recount(type_ids | {type_id})
+    return changed
+
+
+@transaction.atomic
+def set_in_stock(products, in_stock):
+    type_ids = set(products.order_by().values_list('type_id', flat=True).distinct())
+    changed = _touch(products, in_stock=in_stock)
+    recount(type_ids)
+    return changed
+
+
+# Действие → (функция, поле значения в запросе)
+ACTIONS = {
+    'set_colors': (set_colors, 'colors'),
+    'add_colors': (add_colors, 'colors'),
+    'remove_colors': (remove_colors, 'colors'),
+    'set_type': (set_type, 'type_id'),
+    'set_in_stock': (set_in_stock, 'in_stock'),
+}
+
+
+def _valid_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_action(data):
+    """
+    Проверяет {"action", "ids", <значение>} из /products/bulk/; возвращает (функция, ids, значение)
+    или текст ошибки. Несуществующие id пропускаются, тип проверяется запросом к базе.
+    """
+    action = data.get('action')
+    if action not in ACTIONS:
+        return f"Unknown action, expected one of: {', '.join(ACTIONS)}"
+    function, field = ACTIONS[action]
+
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or not all(_valid_id(pk) for pk in ids):
+        return "Field 'ids' must be a non-empty list of integers"
+    if len(ids) > MAX_ACTION_PRODUCTS:
+        return f"Too many products, maximum is {MAX_ACTION_PRODUCTS}"
+
+    value = data.get(field)
+    if field == 'colors':
+        if not isinstance(value, list) or not value or not all(isinstance(color, str) for color in value):
+            return "Field 'colors' must be a non-empty list of color strings"
+        try:
+            value = [normalize_color(color) for color in value]
+        except ValueError as error:
+            return str(error)
+    elif field == 'type_id':
+        if not _valid_id(value) or not Type.objects.filter(pk=value).exists():
+            return "Type not found"
+    elif not isinstance(value, bool):
+        return f"Field '{field}' must be a boolean"
+    return function, ids, value
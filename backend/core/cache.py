@@ -0,0 +1,120 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+from .compression import apply_encoding, is_compressible, precompress
+from .conditional import response_media
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CACHED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified', 'Vary', 'Allow']
+
+
+def catalog_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def get_catalog_version():
+    cache = catalog_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Начинаем с метки времени, а не с 1: если счётчик вытеснен из кеша,
+        # старые записи с меньшей версией не станут снова актуальными
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+async def aget_catalog_version():
+    """get_catalog_version() для асинхронных представлений (core/async_views.py)"""
+    cache = catalog_cache()
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache = catalog_cache()
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+
+def is_anonymous(request):
+    """Без токена и сессии; проверяем заголовки, чтобы не делать запрос к базе за токеном"""
+    return ('HTTP_AUTHORIZATION' not in request.META
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+
+def response_cache_key(request, version):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    digest = hashlib.md5(f'{response_media(request)}:{request.path}?{query}'.encode()).hexdigest()
+    # Записи хранят тело вместе со сжатыми копиями: (content, headers, {кодировка: байты})
+    return f'catalog:responses:{version}:{digest}'
+
+
+def cached_response(request, entry):
+    """Ответ из записи кеша: 304 по валидаторам или тело, сжатое по Accept-Encoding"""
+    content, headers, encoded = entry
+    last_modified = parse_http_date_safe(headers.get('Last-Modified', ''))
+    not_modified = get_conditional_response(request, etag=headers.get('ETag'), last_modified=last_modified)
+    response = not_modified or HttpResponse(content, content_type=headers['Content-Type'])
+    for header in ('ETag', 'Last-Modified', 'Allow'):
+        if header in headers:
+            response[header] = headers[header]
+    # Vary ответа представления (Accept от DRF): иначе промежуточный кеш отдал бы HTML клиенту JSON.
+    # Cookie при промахе добавляет SessionMiddleware (DRF читает сессию), попадание сессию не трогает
+    vary = [value.strip() for value in headers.get('Vary', '').split(',') if value.strip()]
+    patch_vary_headers(response, vary + ['Cookie'])
+    if not_modified is None:
+        apply_encoding(request, response, encoded)
+    else:
+        # 304 несёт тот же Vary, что и ответ 200 (RFC 9110, 15.4.5)
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def cache_entry(request, response):
+    """Запись кеша для отрендеренного ответа 200; в сам ответ подставляется сжатое тело"""
+    headers = {header: response[header] for header in CACHED_HEADERS if header in response}
+    # Сжимаем один раз при записи: попадания в кеш не тратят CPU на сжатие
+    encoded = precompress(response.content) if is_compressible(response) else {}
+    entry = (response.content, headers, encoded)
+    apply_encoding(request, response, encoded)
+    return entry
+
+
+class CatalogCacheMixin:
+    """
+    Кеширует готовые ответы GET для анонимных клиентов.
+
+    Ключ содержит версию каталога, которую сигналы из core/signals.py увеличивают
+    при любом изменении категорий, типов, продуктов, изображений и цветов,
+    поэтому устаревшие записи просто перестают читаться и вытесняются по TTL.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or not is_anonymous(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = catalog_cache()
+        key = response_cache_key(request, get_catalog_version())
+        cached = cache.get(key)
+        if cached is not None:
+            return cached_response(request, cached)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.render()
+            cache.set(key, cache_entry(request, response))
+        response['X-Cache'] = 'MISS'
+        return response
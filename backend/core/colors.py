@@ -0,0 +1,50 @@
+import re
+import threading
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+HEX_COLOR_RE = re.compile(r'#?([0-9A-F]{3}|[0-9A-F]{6})')
+
+
+def normalize_color(value):
+    """' #fff', 'ffffff', '#FfFfFf' → '#FFFFFF'; не hex-цвет — ValueError"""
+    match = HEX_COLOR_RE.fullmatch(value.strip().upper())
+    if match is None:
+        raise ValueError(f'Неверный цвет {value!r}, ожидается #RRGGBB')
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = ''.join(digit * 2 for digit in digits)
+    return f'#{digits}'
+
+
+def validate_color(value):
+    try:
+        normalize_color(value)
+    except ValueError as error:
+        raise ValidationError(str(error))
+
+
+# id цветов по значению, общий для потоков процесса. Цветов в каталоге десятки, поэтому
+# без вытеснения; заполняется после коммита, сбрасывается при изменении и удалении цвета.
+_color_ids = {}
+_lock = threading.Lock()
+
+
+def cached_color_ids(colors):
+    with _lock:
+        return {color: _color_ids[color] for color in colors if color in _color_ids}
+
+
+def remember_color_ids(color_ids, using=None):
+    # После коммита: id из откатившейся транзакции в кеш не попадут
+    def remember():
+        with _lock:
+            _color_ids.update(color_ids)
+
+    transaction.on_commit(remember, using=using)
+
+
+def forget_color_ids():
+    with _lock:
+        _color_ids.clear()
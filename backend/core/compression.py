@@ -0,0 +1,110 @@
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # необязательная зависимость: без неё только gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+# Уровни сжатия на лету и для записей кеша: запись сжимается один раз, поэтому можно сильнее
+LEVELS = {'gzip': (6, 9), 'br': (4, 9)}
+
+
+def available_encodings():
+    """Кодировки в порядке предпочтения сервера"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate(accept_encoding):
+    """
+    Лучшая кодировка из Accept-Encoding с учётом q-значений и «*»,
+    или None, если клиент не принимает ни одну из доступных (отдаём без сжатия).
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in available_encodings():
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(content, encoding, cached=False):
+    level = LEVELS[encoding][1 if cached else 0]
+    if encoding == 'br':
+        return brotli.compress(content, quality=level)
+    # mtime=0: одинаковые ответы дают одинаковые байты
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').lower()
+    return (not response.streaming and response.status_code == 200
+            and not response.has_header('Content-Encoding')
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+            and len(response.content) >= settings.COMPRESSION_MIN_SIZE)
+
+
+def precompress(content):
+    """Сжатые копии тела для записи кеша: {кодировка: байты}, только если сжатие выгодно"""
+    encoded = {}
+    for encoding in available_encodings():
+        compressed = compress(content, encoding, cached=True)
+        if len(compressed) < len(content):
+            encoded[encoding] = compressed
+    return encoded
+
+
+def apply_encoding(request, response, encoded):
+    """Подставляет готовое сжатое тело по Accept-Encoding запроса"""
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding not in encoded:
+        return response
+    response.content = encoded[encoding]
+    response['Content-Length'] = str(len(response.content))
+    response['Content-Encoding'] = encoding
+    # Тело другое, поэтому ETag слабый, как у django.middleware.gzip
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжатие ответов API (JSON, текст) brotli или gzip по Accept-Encoding, начиная
+    с COMPRESSION_MIN_SIZE байт. Ответы из кеша каталога приходят уже сжатыми
+    (core/cache.py) и пропускаются. Изображения уже сжаты и не обрабатываются.
+    """
+
+    def process_response(self, request, response):
+        if not is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        return apply_encoding(request, response, {encoding: compressed})
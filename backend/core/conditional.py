@@ -0,0 +1,80 @@
+import hashlib
+from calendar import timegm
+from urllib.parse import urlencode
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+# Поля updated_at, от которых зависит представление объекта в API.
+# Изображения и цвета продукта обновляют Product.updated_at через сигналы (core/signals.py),
+# счётчики продуктов типа и категории — counted_at (core/counters.py).
+VALIDATOR_FIELDS = {
+    'Category': ['updated_at', 'counted_at'],
+    'Type': ['updated_at', 'counted_at', 'category__updated_at', 'category__counted_at'],
+    'Product': ['updated_at', 'type__updated_at', 'type__category__updated_at'],
+}
+
+
+class Validators:
+    def __init__(self, etag, last_modified, count):
+        self.etag = etag
+        self.last_modified = last_modified
+        # Строк в queryset: детальные представления по 0 отвечают 404, а не 304
+        self.count = count
+
+
+def response_media(request):
+    """Браузер получает HTML от BrowsableAPIRenderer, остальные клиенты — JSON"""
+    return 'html' if 'text/html' in request.META.get('HTTP_ACCEPT', '') else 'json'
+
+
+def compute_validators(request, queryset):
+    """
+    ETag и Last-Modified для ответа по queryset одним агрегирующим запросом, без сериализации:
+    max(updated_at) по объекту и его связям плюс количество строк, нормализованная строка запроса
+    и тип ответа (HTML и JSON — разные представления, у них разные ETag).
+    """
+    fields = VALIDATOR_FIELDS[queryset.model.__name__]
+    return _validators(request, fields, queryset.order_by().aggregate(**_aggregates(fields)))
+
+
+async def acompute_validators(request, queryset):
+    """compute_validators() для асинхронных представлений (core/async_views.py)"""
+    fields = VALIDATOR_FIELDS[queryset.model.__name__]
+    return _validators(request, fields, await queryset.order_by().aaggregate(**_aggregates(fields)))
+
+
+def validators_for(request, model, state):
+    """Валидаторы по уже посчитанному состоянию {count, max_0, ...}, например движком каталога (core/engine.py)"""
+    return _validators(request, VALIDATOR_FIELDS[model.__name__], state)
+
+
+def _aggregates(fields):
+    return {'count': Count('pk'), **{f'max_{i}': Max(field) for i, field in enumerate(fields)}}
+
+
+def _validators(request, fields, state):
+    timestamps = [state[f'max_{i}'] for i in range(len(fields)) if state[f'max_{i}'] is not None]
+    last_modified = max(timestamps) if timestamps else None
+
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    source = '|'.join([response_media(request), request.path, query, str(state['count'])]
+                      + [ts.isoformat() for ts in timestamps])
+    etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+    return Validators(etag, timegm(last_modified.utctimetuple()) if last_modified else None, state['count'])
+
+
+def conditional_response(request, validators):
+    """304 (или 412) по If-None-Match/If-Modified-Since, если тело отдавать не нужно, иначе None"""
+    response = get_conditional_response(
+        request, etag=validators.etag, last_modified=validators.last_modified
+    )
+    return set_validators(response, validators) if response is not None else None
+
+
+def set_validators(response, validators):
+    response['ETag'] = validators.etag
+    if validators.last_modified is not None:
+        response['Last-Modified'] = http_date(validators.last_modified)
+    return response
@@ -0,0 +1,82 @@
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import COUNTER_FIELDS, Category, Type, Product
+
+
+def _shifted(field, delta):
+    # Не ниже нуля: продукты из loaddata (raw) и bulk_create не были учтены, их удаление
+    # не должно нарушать CHECK положительного поля; точные значения вернёт recount()
+    return Greatest(F(field) + delta, 0)
+
+
+def adjust_counts(type_id, products=0, in_stock=0):
+    """
+    Сдвигает счётчики типа и его категории F-выражениями: без чтения и без гонок между
+    параллельными запросами. Для ETag списков типов и категорий сдвигается counted_at.
+    """
+    changes = {}
+    if products:
+        changes['product_count'] = _shifted('product_count', products)
+    if in_stock:
+        changes['in_stock_count'] = _shifted('in_stock_count', in_stock)
+    if not changes:
+        return
+    changes['counted_at'] = timezone.now()
+    Type.objects.filter(pk=type_id).update(**changes)
+    Category.objects.filter(type=type_id).update(**changes)
+
+
+def move_type_counts(type_id, old_category_id, new_category_id):
+    """Тип перенесён в другую категорию: его продукты переходят вместе с ним"""
+    total, in_stock = Type.objects.filter(pk=type_id).values_list(*COUNTER_FIELDS).get()
+    now = timezone.now()
+    for category_id, sign in ((old_category_id, -1), (new_category_id, 1)):
+        Category.objects.filter(pk=category_id).update(
+            product_count=_shifted('product_count', sign * total),
+            in_stock_count=_shifted('in_stock_count', sign * in_stock),
+            counted_at=now,
+        )
+
+
+def recount(type_ids=None, category_ids=()):
+    """
+    Пересчитывает счётчики по таблице продуктов: типов из type_ids (None — всех) и их категорий,
+    плюс категорий из category_ids. Записываются только разошедшиеся строки; возвращает их число.
+    Для bulk-операций, которые не отправляют сигналы, и для manage.py recount_catalog.
+    """
+    types = Type.objects.all() if type_ids is None else Type.objects.filter(pk__in=type_ids)
+    types = list(types.only('id', 'category_id', *COUNTER_FIELDS))
+    actual = {
+        row['type_id']: (row['total'], row['in_stock'])
+        for row in Product.objects.filter(type__in=[t.pk for t in types]).values('type_id').annotate(
+            total=Count('pk'), in_stock=Count('pk', filter=Q(in_stock=True)))
+    }
+    now = timezone.now()
+    changed_types = []
+    for type_obj in types:
+        counts = actual.get(type_obj.pk, (0, 0))
+        if (type_obj.product_count, type_obj.in_stock_count) != counts:
+            type_obj.product_count, type_obj.in_stock_count = counts
+            type_obj.counted_at = now
+            changed_types.append(type_obj)
+    Type.objects.bulk_update(changed_types, COUNTER_FIELDS + ['counted_at'])
+
+    categories = Category.objects.all() if type_ids is None else Category.objects.filter(
+        pk__in={t.category_id for t in types} | set(category_ids))
+    categories = list(categories.only('id', *COUNTER_FIELDS))
+    sums = {
+        row['category_id']: (row['total'], row['in_stock'])
+        for row in Type.objects.filter(category__in=[c.pk for c in categories]).values('category_id').annotate(
+            total=Sum('product_count'), in_stock=Sum('in_stock_count'))
+    }
+    changed_categories = []
+    for category in categories:
+        counts = sums.get(category.pk, (0, 0))
+        if (category.product_count, category.in_stock_count) != counts:
+            category.product_count, category.in_stock_count = counts
+            category.counted_at = now
+            changed_categories.append(category)
+    Category.objects.bulk_update(changed_categories, COUNTER_FIELDS + ['counted_at'])
+    return len(changed_types) + len(changed_categories)
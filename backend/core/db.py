@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def read_database():
+    """
+    Алиас для чтения публичного каталога (CATALOG_READ_DATABASE). Внутри транзакции
+    основной базы читаем из неё же, иначе не видно собственных незафиксированных изменений.
+    """
+    alias = settings.CATALOG_READ_DATABASE
+    if alias != DEFAULT_DB_ALIAS and connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """PRAGMA из SQLITE_PRAGMAS для каждого нового соединения; соединение для чтения — только чтение"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        if connection.alias != DEFAULT_DB_ALIAS and connection.alias == settings.CATALOG_READ_DATABASE:
+            cursor.execute('PRAGMA query_only = ON')
@@ -0,0 +1,345 @@
+"""
+Движок каталога в памяти процесса: список продуктов без SQL для фильтров по числовым
+столбцам, типу, категории, наличию и датам.
+
+Снимок каталога — столбцы NumPy, упорядоченные по id, и лениво построенные перестановки
+для каждого поля сортировки. Фильтры считаются векторными масками, страница — срез
+упорядоченных id; из базы читаются только строки страницы. Снимок догружается при смене
+версии каталога (core/cache.py): строки с недавним updated_at, удалённые id и таблица типов.
+
+Ответ совпадает с SQL-путём ProductListCreateView, включая ETag, что проверяется тестами.
+Запросы с текстовыми фильтрами, поиском, цветом и курсором движок не берёт (select() → None).
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import get_catalog_version
+from .models import Type, Product
+
+PRODUCT_COLUMNS = ['id', 'type_id', 'throat_diameter', 'package_volume', 'weight', 'in_stock',
+                   'created_at', 'updated_at', 'product_name']
+NULLABLE_COLUMNS = ['throat_diameter', 'package_volume', 'weight']
+DATETIME_COLUMNS = ['created_at', 'updated_at']
+
+# Параметр запроса → (столбец, сравнение), разбор значений как в core/filters.py
+INT_FILTERS = {
+    'throat_diameter': ('throat_diameter', 'exact'),
+    'throat_diameter_min': ('throat_diameter', 'gte'),
+    'throat_diameter_max': ('throat_diameter', 'lte'),
+    'volume': ('package_volume', 'exact'),
+    'volume_min': ('package_volume', 'gte'),
+    'volume_max': ('package_volume', 'lte'),
+    'weight': ('weight', 'exact'),
+    'weight_min': ('weight', 'gte'),
+    'weight_max': ('weight', 'lte'),
+}
+DATETIME_FILTERS = {
+    'created_at_min': ('created_at', 'gte'),
+    'created_at_max': ('created_at', 'lte'),
+    'updated_at_min': ('updated_at', 'gte'),
+    'updated_at_max': ('updated_at', 'lte'),
+}
+PAGE_PARAMS = {'sort', 'order', 'page', 'page_size', 'view', 'fields', 'expand', 'with_count'}
+SUPPORTED_PARAMS = {'type', 'category', 'in_stock'} | set(INT_FILTERS) | set(DATETIME_FILTERS) | PAGE_PARAMS
+
+# Столбцы max_0..max_2 для conditional.validators_for(), в порядке VALIDATOR_FIELDS['Product']
+VALIDATOR_COLUMNS = ['updated_at', 'type_updated_at', 'category_updated_at']
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+INT64_MIN, INT64_MAX = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+# Строк на одно преобразование в массивы при загрузке: список кортежей целиком не держим
+LOAD_CHUNK = 100_000
+
+
+def _micros(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+def _datetime(micros):
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+def _product_columns(rows):
+    """Строки values_list(*PRODUCT_COLUMNS) → {столбец: массив}; NULL — отдельной маской '<столбец>__null'"""
+    data = dict(zip(PRODUCT_COLUMNS, zip(*rows))) if rows else dict.fromkeys(PRODUCT_COLUMNS, ())
+    columns = {
+        'id': np.array(data['id'], dtype=np.int64),
+        'type_id': np.array(data['type_id'], dtype=np.int64),
+        'in_stock': np.array(data['in_stock'], dtype=bool),
+        'product_name': np.array(data['product_name'], dtype=object),
+    }
+    for name in NULLABLE_COLUMNS:
+        columns[f'{name}__null'] = np.array([value is None for value in data[name]], dtype=bool)
+        columns[name] = np.array([value or 0 for value in data[name]], dtype=np.int64)
+    for name in DATETIME_COLUMNS:
+        columns[name] = np.array([_micros(value) for value in data[name]], dtype=np.int64)
+    return columns
+
+
+def _read_columns(queryset):
+    chunks, rows = [], []
+    for row in queryset.values_list(*PRODUCT_COLUMNS).iterator(chunk_size=10_000):
+        rows.append(row)
+        if len(rows) == LOAD_CHUNK:
+            chunks.append(_product_columns(rows))
+            rows = []
+    chunks.append(_product_columns(rows))
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+def _merge(columns, changed):
+    """Изменённые и новые строки поверх снимка; старые массивы не меняются, их читают другие потоки"""
+    ids = columns['id']
+    positions = np.searchsorted(ids, changed['id'])
+    exists = np.zeros(len(positions), dtype=bool)
+    if len(ids):
+        exists = ids[np.minimum(positions, len(ids) - 1)] == changed['id']
+
+    merged = {}
+    for name, values in columns.items():
+        values = values.copy()
+        values[positions[exists]] = changed[name][exists]
+        merged[name] = np.concatenate([values, changed[name][~exists]])
+    order = np.argsort(merged['id'], kind='stable')
+    return {name: values[order] for name, values in merged.items()}
+
+
+class Snapshot:
+    """Неизменяемое состояние каталога на версию version; перестановки сортировки строятся по требованию"""
+
+    def __init__(self, columns, types, version, watermark, loaded, nulls_largest):
+        self.columns = columns
+        self.version = version
+        self.watermark = watermark
+        self.loaded = loaded  # time.monotonic() последней полной загрузки
+        self.nulls_largest = nulls_largest
+        self._orders = {}
+
+        # Категория и updated_at типа и категории для каждого продукта — по таблице типов
+        type_ids, category_ids, type_updated, category_updated = types
+        positions = np.searchsorted(type_ids, columns['type_id'])
+        known = positions < len(type_ids)
+        known[known] = type_ids[positions[known]] == columns['type_id'][known]
+        for name, values, default in (('category_id', category_ids, -1), ('type_updated_at', type_updated, 0),
+                                      ('category_updated_at', category_updated, 0)):
+            columns[name] = np.full(len(known), default, dtype=np.int64)
+            columns[name][known] = values[positions[known]]
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def order(self, field):
+        """Позиции строк по возрастанию field, при равенстве — по id; NULL там же, где их ставит база"""
+        if field not in self._orders:
+            values = self.columns[field]
+            if field == 'product_name':
+                # Сравнение строк Python — по кодовым точкам, как BINARY-сравнение SQLite
+                order = np.argsort(values, kind='stable')
+            elif field in NULLABLE_COLUMNS:
+                nulls = self.columns[f'{field}__null']
+                # lexsort стабилен, главный ключ — последний, строки уже упорядочены по id
+                order = np.lexsort((values, nulls if self.nulls_largest else ~nulls))
+            else:
+                order = np.argsort(values, kind='stable')
+            self._orders[field] = order
+        return self._orders[field]
+
+
+class Selection:
+    """Результат запроса: id продуктов в порядке ответа и состояние для ETag и Last-Modified"""
+
+    def __init__(self, ids, state):
+        self.ids = ids
+        self.state = state
+
+
+class CatalogEngine:
+    def __init__(self, using):
+        self.using = using
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """
+        Снимок для текущей версии каталога. При новой версии запросы ждут догрузки, а не отвечают
+        по старому снимку: иначе кеш ответов сохранил бы устаревшие данные под новой версией.
+        """
+        version = get_catalog_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            # Полная перезагрузка раз в CATALOG_ENGINE_MAX_AGE ловит записи в обход сигналов.
+            # Версия та же, поэтому её делает один запрос, остальные пока читают текущий снимок.
+            expired = time.monotonic() - snapshot.loaded >= settings.CATALOG_ENGINE_MAX_AGE
+            if not expired or not self._lock.acquire(blocking=False):
+                return snapshot
+            try:
+                self._snapshot = snapshot = self._load(version)
+            finally:
+                self._lock.release()
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                snapshot = self._load(version)
+            elif snapshot.version != version:
+                snapshot = self._reload(snapshot, version)
+            self._snapshot = snapshot
+        return snapshot
+
+    def forget(self):
+        with self._lock:
+            self._snapshot = None
+
+    def _products(self):
+        return Product.objects.using(self.using).order_by('id')
+
+    def _types(self):
+        rows = list(Type.objects.using(self.using).order_by('id').values_list(
+            'id', 'category_id', 'updated_at', 'category__updated_at'))
+        ids, category_ids, updated, category_updated = zip(*rows) if rows else ((), (), (), ())
+        return (np.array(ids, dtype=np.int64), np.array(category_ids, dtype=np.int64),
+                np.array([_micros(value) for value in updated], dtype=np.int64),
+                np.array([_micros(value) for value in category_updated], dtype=np.int64))
+
+    def _snapshot_for(self, columns, version, watermark, loaded):
+        # Типы — после продуктов: продукт нового типа не окажется в снимке без своего типа
+        nulls_largest = connections[self.using].features.nulls_order_largest
+        return Snapshot(columns, self._types(), version, watermark, loaded, nulls_largest)
+
+    def _load(self, version):
+        loaded, watermark = time.monotonic(), timezone.now()
+        return self._snapshot_for(_read_columns(self._products()), version, watermark, loaded)
+
+    def _reload(self, snapshot, version):
+        """
+        Догрузка: строки с updated_at не старше прошлой загрузки минус CATALOG_ENGINE_RELOAD_WINDOW
+        (updated_at ставится до коммита, окно покрывает длинные транзакции) и удаления — полный
+        список id читается, только если число строк разошлось.
+        """
+        watermark = timezone.now()
+        since = snapshot.watermark - timedelta(seconds=settings.CATALOG_ENGINE_RELOAD_WINDOW)
+        columns = {name: values for name, values in snapshot.columns.items()
+                   if name not in ('category_id', 'type_updated_at', 'category_updated_at')}
+        columns = _merge(columns, _read_columns(self._products().filter(updated_at__gte=since)))
+        if len(columns['id']) != self._products().count():
+            alive = np.fromiter(self._products().values_list('id', flat=True).iterator(), dtype=np.int64)
+            keep = np.isin(columns['id'], alive)
+            columns = {name: values[keep] for name, values in columns.items()}
+        return self._snapshot_for(columns, version, watermark, snapshot.loaded)
+
+    def select(self, params):
+        """
+        Selection для query-параметров списка продуктов или None, если запрос нужно выполнить
+        через SQL. Параметры уже проверены filter_products()/sort_products().
+        """
+        if 'cursor' in params or any(params.get(name) for name in params if name not in SUPPORTED_PARAMS):
+            return None
+        sort = params.get('sort') or None
+        if sort == 'product_name' and connections[self.using].vendor != 'sqlite':
+            # Порядок строк на других СУБД задаёт collation базы
+            return None
+        conditions = _conditions(params)
+        if conditions is None:
+            return None
+
+        snapshot = self.snapshot()
+        columns = snapshot.columns
+        mask = np.ones(len(snapshot), dtype=bool)
+        for column, lookup, value in conditions:
+            if lookup == 'exact':
+                matched = columns[column] == value
+            elif lookup == 'gte':
+                matched = columns[column] >= value
+            else:
+                matched = columns[column] <= value
+            if column in NULLABLE_COLUMNS:
+                matched &= ~columns[f'{column}__null']
+            mask &= matched
+
+        if sort:
+            order = snapshot.order(sort)
+            if params.get('order', 'asc') == 'desc':
+                order = order[::-1]
+            positions = order[mask[order]]
+        else:
+            positions = np.flatnonzero(mask)
+
+        state = {'count': len(positions)}
+        for i, column in enumerate(VALIDATOR_COLUMNS):
+            state[f'max_{i}'] = _datetime(columns[column][positions].max()) if len(positions) else None
+        return Selection(columns['id'][positions], state)
+
+
+def _conditions(params):
+    """[(столбец, сравнение, значение)] из параметров; None — значение движку не подходит"""
+    conditions = []
+    for name, column in (('type', 'type_id'), ('category', 'category_id')):
+        if params.get(name):
+            conditions.append((column, 'exact', int(params.get(name))))
+
+    in_stock = params.get('in_stock')
+    if in_stock:
+        conditions.append(('in_stock', 'exact', in_stock in ('1', 'true')))
+
+    for name, (column, lookup) in INT_FILTERS.items():
+        if params.get(name):
+            conditions.append((column, lookup, int(params.get(name))))
+
+    for name, (column, lookup) in DATETIME_FILTERS.items():
+        if params.get(name):
+            value = parse_datetime(params.get(name))
+            if value is None:
+                return None
+            if timezone.is_naive(value):
+                # Как DateTimeField.get_prep_value при USE_TZ
+                value = timezone.make_aware(value, timezone.get_default_timezone())
+            conditions.append((column, lookup, _micros(value)))
+
+    if any(not INT64_MIN <= value <= INT64_MAX for _, _, value in conditions):
+        return None
+    return conditions
+
+
+def page_rows(fast, ids, using, extra=()):
+    """Строки FastProductSerializer.values() для id страницы в их порядке, одним запросом"""
+    ids = ids.tolist()
+    rows = {row['id']: row for row in fast.values(Product.objects.using(using).filter(pk__in=ids), extra)}
+    # Продукт, удалённый после построения снимка, пропускаем
+    return [rows[pk] for pk in ids if pk in rows]
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def catalog_engine(using):
+    """
+    Движок для алиаса базы, если включён CATALOG_ENGINE. Внутри транзакции — None: снимок общий
+    для потоков и не должен видеть незафиксированные изменения.
+    """
+    if not settings.CATALOG_ENGINE or connections[using].in_atomic_block:
+        return None
+    with _engines_lock:
+        if using not in _engines:
+            _engines[using] = CatalogEngine(using)
+        return _engines[using]
+
+
+def select_products(params, using):
+    """Selection движка для параметров GET /products/ или None — запрос идёт через SQL"""
+    engine = catalog_engine(using)
+    return engine.select(params) if engine is not None else None
+
+
+def forget_engines():
+    with _engines_lock:
+        _engines.clear()
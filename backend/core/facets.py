@@ -0,0 +1,67 @@
+from django.db.models import Count
+
+from .filters import filter_products
+from .models import Product
+
+# Параметры фильтра, которые отбрасываются при подсчёте своей группы: счётчики по типам
+# считаются без учёта выбранного типа, иначе у остальных вариантов всегда был бы 0.
+FACET_PARAMS = {
+    'category': ['category'],
+    'type': ['type'],
+    'package_volume': ['volume', 'volume_min', 'volume_max'],
+    'throat_diameter': ['throat_diameter', 'throat_diameter_min', 'throat_diameter_max'],
+    'color': ['color'],
+    'in_stock': ['in_stock'],
+}
+IGNORED_PARAMS = ['sort', 'order', 'page', 'page_size', 'cursor', 'with_count']
+
+
+def _filtered(params, exclude=(), using=None):
+    params = {key: value for key, value in params.items() if key not in exclude and key not in IGNORED_PARAMS}
+    # Порядок и релевантность поиска для группировки не нужны. Ранжированный поиск соединяется
+    # с FTS-таблицей и не работает как подзапрос (фасет цветов), поэтому ranked=False
+    return filter_products(Product.objects.using(using), params, ranked=False).order_by()
+
+
+def _values(products, field):
+    rows = products.exclude(**{field: None}).values(field).annotate(count=Count('pk')).order_by(field)
+    return [{'value': row[field], 'count': row['count']} for row in rows]
+
+
+def product_facets(params, using=None):
+    """
+    Количество продуктов по каждому значению фильтруемых полей при текущих фильтрах:
+    по одному запросу с GROUP BY на группу, без выборки самих продуктов.
+    При неверном значении параметра бросает ProductFilterError. using — алиас базы для чтения.
+    """
+    facets = {}
+
+    rows = _filtered(params, FACET_PARAMS['category'], using).values(
+        'type__category_id', 'type__category__category_name'
+    ).annotate(count=Count('pk')).order_by('type__category__category_name')
+    facets['category'] = [
+        {'id': row['type__category_id'], 'name': row['type__category__category_name'], 'count': row['count']}
+        for row in rows
+    ]
+
+    rows = _filtered(params, FACET_PARAMS['type'], using).values(
+        'type_id', 'type__type_name', 'type__category_id'
+    ).annotate(count=Count('pk')).order_by('type__type_name')
+    facets['type'] = [
+        {'id': row['type_id'], 'name': row['type__type_name'], 'category_id': row['type__category_id'],
+         'count': row['count']}
+        for row in rows
+    ]
+
+    facets['package_volume'] = _values(_filtered(params, FACET_PARAMS['package_volume'], using), 'package_volume')
+    facets['throat_diameter'] = _values(_filtered(params, FACET_PARAMS['throat_diameter'], using), 'throat_diameter')
+
+    # Цвета — через таблицу связей, чтобы не размножать строки продуктов JOIN'ом
+    rows = Product.colors.through.objects.using(using).filter(
+        product_id__in=_filtered(params, FACET_PARAMS['color'], using).values('pk')
+    ).values('productcolor__color').annotate(count=Count('product_id', distinct=True)).order_by('productcolor__color')
+    facets['color'] = [{'value': row['productcolor__color'], 'count': row['count']} for row in rows]
+
+    facets['in_stock'] = _values(_filtered(params, FACET_PARAMS['in_stock'], using), 'in_stock')
+
+    return {'count': _filtered(params, using=using).count(), 'facets': facets}
@@ -0,0 +1,207 @@
+from django.utils.dateparse import parse_datetime
+
+from .colors import normalize_color
+from .models import Product
+from .search import search_products
+
+SORT_FIELDS = ['product_name', 'package_volume', 'created_at', 'updated_at', 'throat_diameter', 'weight']
+
+
+class ProductFilterError(ValueError):
+    pass
+
+
+def filter_products(products, params, ranked=True):
+    """
+    Применяет фильтры списка продуктов из query-параметров.
+    При неверном значении параметра бросает ProductFilterError с текстом ошибки для ответа 400.
+    ranked=False — поиск q= без сортировки по релевантности, для queryset, который станет подзапросом.
+    """
+    # Фильтрация по типу (обязательный параметр)
+    type_id = params.get('type', None)
+    if type_id:
+        try:
+            products = products.filter(type_id=type_id)
+        except ValueError:
+            raise ProductFilterError("Invalid type ID")
+
+    # Фильтрация по категории через связь type__category
+    category_id = params.get('category', None)
+    if category_id:
+        try:
+            products = products.filter(type__category_id=category_id)
+        except ValueError:
+            raise ProductFilterError("Invalid category ID")
+
+    # Полнотекстовый поиск по всем текстовым полям; поля ниже остаются точечными фильтрами
+    q = params.get('q', None)
+    if q:
+        products = search_products(products, q, ranked=ranked and not params.get('sort'))
+
+    # Оставшаяся логика фильтрации остаётся без изменений
+    name = params.get('name', None)
+    if name:
+        products = products.filter(product_name__icontains=name)
+
+    throat_standard = params.get('throat_standard', None)
+    if throat_standard:
+        products = products.filter(throat_standard__icontains=throat_standard)
+
+    throat_diameter = params.get('throat_diameter', None)
+    if throat_diameter:
+        try:
+            products = products.filter(throat_diameter=int(throat_diameter))
+        except ValueError:
+            raise ProductFilterError("Invalid throat_diameter value")
+
+    throat_diameter_min = params.get('throat_diameter_min', None)
+    throat_diameter_max = params.get('throat_diameter_max', None)
+    if throat_diameter_min:
+        try:
+            products = products.filter(throat_diameter__gte=int(throat_diameter_min))
+        except ValueError:
+            raise ProductFilterError("Invalid throat_diameter_min value")
+    if throat_diameter_max:
+        try:
+            products = products.filter(throat_diameter__lte=int(throat_diameter_max))
+        except ValueError:
+            raise ProductFilterError("Invalid throat_diameter_max value")
+
+    volume = params.get('volume', None)
+    if volume:
+        try:
+            products = products.filter(package_volume=int(volume))
+        except ValueError:
+            raise ProductFilterError("Invalid volume value")
+
+    volume_min = params.get('volume_min', None)
+    volume_max = params.get('volume_max', None)
+    if volume_min:
+        try:
+            products = products.filter(package_volume__gte=int(volume_min))
+        except ValueError:
+            raise ProductFilterError("Invalid volume_min value")
+    if volume_max:
+        try:
+            products = products.filter(package_volume__lte=int(volume_max))
+        except ValueError:
+            raise ProductFilterError("Invalid volume_max value")
+
+    dimensions = params.get('dimensions', None)
+    if dimensions:
+        products = products.filter(dimensions__icontains=dimensions)
+
+    compound = params.get('compound', None)
+    if compound:
+        products = products.filter(compound__icontains=compound)
+
+    color = params.get('color', None)
+    if color:
+        try:
+            color = normalize_color(color)
+        except ValueError:
+            raise ProductFilterError("Invalid color")
+        # Через подзапрос к таблице связей: JOIN по colors размножил бы строки продуктов
+        products = products.filter(
+            id__in=Product.colors.through.objects.filter(productcolor__color=color).values('product_id')
+        )
+
+    in_stock = params.get('in_stock', None)
+    if in_stock:
+        if in_stock not in ('1', 'true', '0', 'false'):
+            raise ProductFilterError("Invalid in_stock value")
+        products = products.filter(in_stock=in_stock in ('1', 'true'))
+
+    material = params.get('material', None)
+    if material:
+        products = products.filter(material__icontains=material)
+
+    package = params.get('package', None)
+    if package:
+        products = products.filter(package__icontains=package)
+
+    weight = params.get('weight', None)
+    if weight:
+        try:
+            products = products.filter(weight=int(weight))
+        except ValueError:
+            raise ProductFilterError("Invalid weight value")
+
+    weight_min = params.get('weight_min', None)
+    weight_max = params.get('weight_max', None)
+    if weight_min:
+        try:
+            products = products.filter(weight__gte=int(weight_min))
+        except ValueError:
+            raise ProductFilterError("Invalid weight_min value")
+    if weight_max:
+        try:
+            products = products.filter(weight__lte=int(weight_max))
+        except ValueError:
+            raise ProductFilterError("Invalid weight_max value")
+
+    application = params.get('application', None)
+    if application:
+        products = products.filter(application__icontains=application)
+
+    description = params.get('description', None)
+    if description:
+        products = products.filter(description__icontains=description)
+
+    created_at_min = params.get('created_at_min', None)
+    created_at_max = params.get('created_at_max', None)
+    if created_at_min:
+        try:
+            created_at_min_dt = parse_datetime(created_at_min)
+            products = products.filter(created_at__gte=created_at_min_dt)
+        except ValueError:
+            raise ProductFilterError("Invalid created_at_min format")
+    if created_at_max:
+        try:
+            created_at_max_dt = parse_datetime(created_at_max)
+            products = products.filter(created_at__lte=created_at_max_dt)
+        except ValueError:
+            raise ProductFilterError("Invalid created_at_max format")
+
+    updated_at_min = params.get('updated_at_min', None)
+    updated_at_max = params.get('updated_at_max', None)
+    if updated_at_min:
+        try:
+            updated_at_min_dt = parse_datetime(updated_at_min)
+            products = products.filter(updated_at__gte=updated_at_min_dt)
+        except ValueError:
+            raise ProductFilterError("Invalid updated_at_min format")
+    if updated_at_max:
+        try:
+            updated_at_max_dt = parse_datetime(updated_at_max)
+            products = products.filter(updated_at__lte=updated_at_max_dt)
+        except ValueError:
+            raise ProductFilterError("Invalid updated_at_max format")
+
+    return products
+
+
+def sort_products(products, params):
+    """
+    Сортировка по sort/order; при равных значениях и без sort — по id, чтобы страницы
+    не пересекались и совпадали с движком каталога (core/engine.py). Поиск без sort
+    уже упорядочен по релевантности.
+    """
+    sort_by = params.get('sort', None)
+    order = params.get('order', 'asc')
+    # Курсор — ключ (поле сортировки, id), ранг поиска в него не входит: без sort порядок
+    # страниц разошёлся бы с релевантностью, которую обещает q
+    if 'cursor' in params and params.get('q') and not sort_by:
+        raise ProductFilterError("Cursor pagination with q requires sort")
+    if sort_by:
+        if sort_by in SORT_FIELDS:
+            if order == 'desc':
+                products = products.order_by(f'-{sort_by}', '-id')
+            else:
+                products = products.order_by(sort_by, 'id')
+        else:
+            raise ProductFilterError("Invalid sort field")
+    elif not products.ordered:
+        products = products.order_by('id')
+
+    return products
@@ -0,0 +1,105 @@
+import hashlib
+import io
+import posixpath
+import re
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Ширины производных изображений: сетка каталога, карточка товара, полноэкранный просмотр
+VARIANT_WIDTHS = [160, 480, 960]
+VARIANTS_DIR = 'images/variants'
+
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'avif': {'format': 'AVIF', 'quality': 60},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+    'png': {'format': 'PNG', 'optimize': True},
+}
+
+
+# Имена файлов по содержимому: images/<хеш>.jpg, images/variants/<хеш>_480.webp
+HASH_LENGTH = 20
+HASHED_NAME_RE = re.compile(rf'(^|/)[0-9a-f]{{{HASH_LENGTH}}}(_\w+)?\.\w+$')
+
+
+def hashed_name(name, content):
+    """Имя файла из sha256 содержимого: новое содержимое получает новый URL"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return f'{digest.hexdigest()[:HASH_LENGTH]}{posixpath.splitext(name)[1].lower()}'
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+def available_formats():
+    """WebP есть в любой сборке Pillow, AVIF — только если Pillow собран с libavif"""
+    formats = ['webp']
+    if '.avif' in Image.registered_extensions():
+        formats.append('avif')
+    return formats
+
+
+def variant_name(source_name, width, fmt):
+    stem = posixpath.splitext(posixpath.basename(source_name))[0]
+    return f'{VARIANTS_DIR}/{stem}_{width}.{fmt}'
+
+
+def has_variants(product_image):
+    return bool(product_image.image) and product_image.variants.get('source') == product_image.image.name
+
+
+def generate_variants(product_image):
+    """
+    Создаёт уменьшенные копии ProductImage.image во всех форматах и возвращает карту
+    {'source': имя исходника, 'formats': {формат: {ширина: имя файла}}} для поля variants.
+    Исходник не увеличивается: ширины больше оригинала заменяются его собственной шириной.
+    """
+    field = product_image.image
+    storage = field.storage
+    with storage.open(field.name, 'rb') as file:
+        with Image.open(file) as opened:
+            source_format = opened.format
+            source = ImageOps.exif_transpose(opened)
+            source.load()
+
+    # Для совместимого формата PNG сохраняет прозрачность, остальное — JPEG
+    formats = available_formats() + ['png' if source_format == 'PNG' else 'jpeg']
+    widths = sorted({min(width, source.width) for width in VARIANT_WIDTHS})
+
+    variants = {'source': field.name, 'formats': {fmt: {} for fmt in formats}}
+    for width in widths:
+        height = max(1, round(source.height * width / source.width))
+        resized = source.resize((width, height), Image.LANCZOS) if width != source.width else source
+        for fmt in formats:
+            image = resized
+            if fmt == 'jpeg' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            elif fmt != 'jpeg' and image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA')
+            buffer = io.BytesIO()
+            image.save(buffer, **SAVE_OPTIONS[fmt])
+
+            name = variant_name(field.name, width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            variants['formats'][fmt][str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def delete_variants(product_image):
+    storage = product_image.image.storage
+    for names in product_image.variants.get('formats', {}).values():
+        for name in names.values():
+            storage.delete(name)
+
+
+def smallest_variant(product_image, fmt='webp'):
+    names = product_image.variants.get('formats', {}).get(fmt) or {}
+    if not names:
+        return None
+    return names[min(names, key=int)]
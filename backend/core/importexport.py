@@ -0,0 +1,234 @@
+import csv
+import os
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .cache import bump_catalog_version
+from .colors import normalize_color
+from .counters import recount
+from .models import Category, Type, Product, ProductColor
+
+# Колонки файла в порядке экспорта. Тип ищется по паре (category, type) названий.
+COLUMNS = [
+    'article_number', 'product_name', 'category', 'type',
+    'throat_standard', 'throat_diameter', 'package_volume', 'dimensions', 'compound',
+    'material', 'package', 'weight', 'application', 'description', 'in_stock', 'colors',
+]
+TEXT_FIELDS = ['throat_standard', 'dimensions', 'compound', 'material', 'package', 'application', 'description']
+INT_FIELDS = ['throat_diameter', 'package_volume', 'weight']
+PRODUCT_FIELDS = ['product_name', 'type'] + TEXT_FIELDS + INT_FIELDS + ['in_stock']
+COLOR_SEPARATOR = ';'
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in ('csv', 'xlsx'):
+        raise ValueError(f'Неизвестный формат файла: {fmt or path}')
+    return fmt
+
+
+def read_rows(path, fmt):
+    """Построчно отдаёт словари {колонка: значение}, не загружая файл целиком"""
+    if fmt == 'csv':
+        with open(path, newline='', encoding='utf-8-sig') as file:
+            yield from csv.DictReader(file)
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, [])]
+        for values in rows:
+            yield {column: value for column, value in zip(header, values)}
+    finally:
+        workbook.close()
+
+
+class RowWriter:
+    """Запись строк в CSV или XLSX (write_only, без хранения листа в памяти)"""
+
+    def __init__(self, path, fmt):
+        self.path, self.fmt = path, fmt
+
+    def __enter__(self):
+        if self.fmt == 'csv':
+            self.file = open(self.path, 'w', newline='', encoding='utf-8-sig')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(COLUMNS)
+        else:
+            from openpyxl import Workbook
+            self.workbook = Workbook(write_only=True)
+            self.sheet = self.workbook.create_sheet('products')
+            self.sheet.append(COLUMNS)
+        return self
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self.writer.writerow(row)
+        else:
+            self.sheet.append(row)
+
+    def __exit__(self, *exc):
+        if self.fmt == 'csv':
+            self.file.close()
+        else:
+            self.workbook.save(self.path)
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _int(row, column):
+    value = _text(row.get(column))
+    if not value:
+        return None
+    try:
+        number = int(float(value.replace(',', '.')))
+    except ValueError:
+        raise ImportRowError(f'{column}: ожидается число, получено {value!r}')
+    if number < 0:
+        raise ImportRowError(f'{column}: отрицательное значение {number}')
+    return number
+
+
+def _bool(value):
+    value = _text(value).lower()
+    if not value:
+        return True
+    return value not in ('0', 'false', 'no', 'нет', 'n')
+
+
+class ProductImporter:
+    """
+    Импорт продуктов пакетами: upsert по article_number, типы, категории и цвета —
+    через словари в памяти, запись — bulk_create/bulk_update и прямые вставки в таблицу
+    связей Product.colors.through. Всё выполняется в одной транзакции.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.categories = {c.category_name: c for c in Category.objects.all()}
+        self.types = {(t.category.category_name, t.type_name): t for t in Type.objects.select_related('category')}
+        self.created = self.updated = 0
+        self.errors = []
+
+    def run(self, rows):
+        with transaction.atomic():
+            batch = []
+            for line, row in enumerate(rows, start=2):
+                try:
+                    batch.append(self.parse(row))
+                except ImportRowError as error:
+                    self.errors.append(f'строка {line}: {error}')
+                    continue
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            if batch:
+                self.flush(batch)
+
+            # bulk-операции не отправляют сигналы: счётчики типов и кеш каталога обновляем сами
+            recount()
+            transaction.on_commit(bump_catalog_version)
+
+    def resolve_type(self, category_name, type_name):
+        if (category_name, type_name) not in self.types:
+            category = self.categories.get(category_name)
+            if category is None:
+                category = self.categories[category_name] = Category.objects.create(category_name=category_name)
+            self.types[(category_name, type_name)] = Type.objects.create(type_name=type_name, category=category)
+        return self.types[(category_name, type_name)]
+
+    def parse(self, row):
+        article = _text(row.get('article_number'))
+        name = _text(row.get('product_name'))
+        category_name, type_name = _text(row.get('category')), _text(row.get('type'))
+        if not article:
+            raise ImportRowError('не указан article_number')
+        if not name:
+            raise ImportRowError('не указан product_name')
+        if not category_name or not type_name:
+            raise ImportRowError('не указаны category и type')
+
+        values = {
+            'product_name': name,
+            'type': self.resolve_type(category_name, type_name),
+            'in_stock': _bool(row.get('in_stock')),
+        }
+        for field in TEXT_FIELDS:
+            values[field] = _text(row.get(field)) or None
+        for field in INT_FIELDS:
+            values[field] = _int(row, field)
+
+        colors = None
+        if 'colors' in row:
+            try:
+                colors = [normalize_color(c) for c in _text(row['colors']).split(COLOR_SEPARATOR) if c.strip()]
+            except ValueError:
+                raise ImportRowError(f'colors: неверный цвет в {row["colors"]!r}')
+        return article, values, colors
+
+    def flush(self, batch):
+        # Повтор артикула внутри пакета: последняя строка побеждает
+        batch = list({article: (article, values, colors) for article, values, colors in batch}.values())
+        existing = Product.objects.in_bulk([article for article, _, _ in batch], field_name='article_number')
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for article, values, _ in batch:
+            product = existing.get(article)
+            if product is None:
+                to_create.append(Product(article_number=article, **values))
+            else:
+                for field, value in values.items():
+                    setattr(product, field, value)
+                product.updated_at = now
+                to_update.append(product)
+
+        Product.objects.bulk_create(to_create, batch_size=self.batch_size)
+        Product.objects.bulk_update(to_update, PRODUCT_FIELDS + ['updated_at'], batch_size=self.batch_size)
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+        products = {p.article_number: p for p in to_create + to_update}
+        self.write_colors(batch, products)
+        if search.search_available():
+            search.index_products(Product.objects.filter(pk__in=[p.pk for p in products.values()]))
+
+    def write_colors(self, batch, products):
+        with_colors = [(products[article].pk, colors) for article, _, colors in batch if colors is not None]
+        if not with_colors:
+            return
+
+        color_ids = ProductColor.objects.resolve([color for _, colors in with_colors for color in colors])
+        Through = Product.colors.through
+        Through.objects.filter(product_id__in=[pk for pk, _ in with_colors]).delete()
+        Through.objects.bulk_create([
+            Through(product_id=pk, productcolor_id=color_ids[color])
+            for pk, colors in with_colors for color in dict.fromkeys(colors)
+        ], batch_size=self.batch_size)
+
+
+def export_rows(products):
+    for product in products:
+        yield [
+            product.article_number, product.product_name,
+            product.type.category.category_name, product.type.type_name,
+        ] + [
+            getattr(product, field) for field in COLUMNS[4:14]
+        ] + [
+            int(product.in_stock),
+            COLOR_SEPARATOR.join(color.color for color in product.colors.all()),
+        ]
@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .images import generate_variants, has_variants
+from .models import ImageJob, ImageStatus, Product, ProductImage
+
+# Задача в статусе running дольше этого времени считается брошенной упавшим воркером
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+RETRY_BASE_DELAY = timedelta(seconds=10)
+
+
+def needs_processing(product_image):
+    """
+    Производных нет или они от другого файла, и задача ещё не стоит в очереди. Выполняющаяся
+    задача по другому файлу не в счёт: её результат устареет, текущий файл нужно обработать заново.
+    """
+    if not product_image.image or has_variants(product_image):
+        return False
+    return not product_image.jobs.filter(
+        Q(status=ImageJob.Status.PENDING) | Q(status=ImageJob.Status.RUNNING, source=product_image.image.name)
+    ).exists()
+
+
+def start_values(now):
+    """Поля UPDATE захвата задачи; source — текущее имя файла, прочитанное тем же запросом"""
+    return {
+        'status': ImageJob.Status.RUNNING, 'locked_at': now, 'attempts': F('attempts') + 1,
+        'source': Coalesce(Subquery(ProductImage.objects.filter(pk=OuterRef('image_id')).values('image')[:1]),
+                           Value('')),
+    }
+
+
+def enqueue_image(product_image, eager=None):
+    """
+    Ставит изображение в очередь на генерацию производных; с IMAGE_JOBS_EAGER (или eager=True)
+    обрабатывает сразу после коммита
+    """
+    ProductImage.objects.filter(pk=product_image.pk).update(status=ImageStatus.PENDING)
+    product_image.status = ImageStatus.PENDING
+    touch_product(product_image.product_id)
+    job = ImageJob.objects.create(image=product_image)
+    if settings.IMAGE_JOBS_EAGER if eager is None else eager:
+        transaction.on_commit(lambda: run_job_inline(job.pk))
+    return job
+
+
+def release_stale_jobs():
+    ImageJob.objects.filter(
+        status=ImageJob.Status.RUNNING, locked_at__lt=timezone.now() - STALE_JOB_TIMEOUT
+    ).update(status=ImageJob.Status.PENDING, locked_at=None)
+
+
+def claim_jobs(limit):
+    """
+    Забирает до limit готовых к запуску задач. Захват — условный UPDATE по статусу,
+    поэтому несколько воркеров не возьмут одну задачу ни на SQLite, ни на PostgreSQL.
+    """
+    now = timezone.now()
+    candidates = ImageJob.objects.filter(
+        status=ImageJob.Status.PENDING, run_after__lte=now
+    ).order_by('run_after', 'id').values_list('pk', flat=True)[:limit * 2]
+
+    claimed = []
+    for pk in candidates:
+        taken = ImageJob.objects.filter(pk=pk, status=ImageJob.Status.PENDING).update(**start_values(now))
+        if taken:
+            claimed.append(pk)
+        if len(claimed) == limit:
+            break
+    return list(ImageJob.objects.filter(pk__in=claimed).select_related('image'))
+
+
+def process_image(image_name):
+    """Выполняется в дочернем процессе: только работа с файлами, без обращений к базе"""
+    return generate_variants(ProductImage(image=image_name))
+
+
+def touch_product(product_id):
+    # Статус и variants входят в ответ API: сдвигаем ETag продукта и версию кеша каталога
+    Product.objects.filter(pk=product_id).update(updated_at=timezone.now())
+    transaction.on_commit(bump_catalog_version)
+
+
+@transaction.atomic
+def complete_job(job, variants):
+    # Имя файла — текущее, а не прочитанное при захвате задачи: его могли заменить во время обработки
+    image = ProductImage.objects.select_for_update().filter(pk=job.image_id).first()
+    if image is None:
+        return
+    if image.image.name != variants['source']:
+        # Результат устарел. Задачу на новый файл ставит сохранение изображения, но если оно
+        # застало эту задачу выполняющейся по тому же имени, очередь пуста — ставим сами
+        ImageJob.objects.filter(pk=job.pk).update(status=ImageJob.Status.DONE, locked_at=None)
+        if needs_processing(image):
+            enqueue_image(image)
+        return
+    ProductImage.objects.filter(pk=image.pk).update(variants=variants, status=ImageStatus.READY)
+    ImageJob.objects.filter(pk=job.pk).update(status=ImageJob.Status.DONE, locked_at=None, last_error='')
+    touch_product(image.product_id)
+
+
+@transaction.atomic
+def fail_job(job, error):
+    if job.attempts >= job.max_attempts:
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=ImageJob.Status.FAILED, locked_at=None, last_error=error
+        )
+        ProductImage.objects.filter(pk=job.image_id).update(status=ImageStatus.FAILED)
+        touch_product(job.image.product_id)
+    else:
+        # Экспоненциальная пауза перед повтором: 10 с, 20 с, 40 с...
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=ImageJob.Status.PENDING, locked_at=None, last_error=error,
+            run_after=timezone.now() + RETRY_BASE_DELAY * 2 ** (job.attempts - 1),
+        )
+
+
+def run_job_inline(job_pk):
+    """Синхронное выполнение задачи в текущем процессе (IMAGE_JOBS_EAGER, тесты)"""
+    ImageJob.objects.filter(pk=job_pk).update(**start_values(timezone.now()))
+    job = ImageJob.objects.select_related('image').get(pk=job_pk)
+    try:
+        variants = process_image(job.source)
+    except Exception as error:
+        fail_job(job, repr(error))
+    else:
+        complete_job(job, variants)
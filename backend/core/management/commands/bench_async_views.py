@@ -0,0 +1,180 @@
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.management.commands.bench_product_serializers import Command as SerializerBenchmark
+
+# Режимы сервера: (название, команда, ASYNC_CATALOG_VIEWS)
+SERVERS = [
+    ('sync WSGI (gunicorn gthread)',
+     ['-m', 'gunicorn', 'config.wsgi', '--worker-class', 'gthread', '--threads', '{threads}'], '0'),
+    ('sync под ASGI (uvicorn)', ['-m', 'uvicorn', 'config.asgi:application', '--no-access-log'], '0'),
+    ('async (uvicorn)', ['-m', 'uvicorn', 'config.asgi:application', '--no-access-log'], '1'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест чтения каталога: синхронные представления под WSGI (gunicorn) и под ASGI '
+            '(uvicorn) против асинхронных (ASYNC_CATALOG_VIEWS=1) при 50–500 одновременных соединениях. '
+            'База — временный SQLite-файл, кеш ответов каталога отключён, чтобы мерить сами представления.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--concurrency', default='50,100,250,500',
+                            help='Числа одновременных соединений через запятую')
+        parser.add_argument('--duration', type=float, default=10, help='Секунд на каждый уровень')
+        parser.add_argument('--workers', type=int, default=2, help='Процессов сервера (как в Dockerfile)')
+        parser.add_argument('--threads', type=int, default=8, help='Потоков на процесс gunicorn')
+        parser.add_argument('--with-cache', action='store_true', help='Не отключать кеш ответов каталога')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        with tempfile.TemporaryDirectory() as directory:
+            database = Path(directory) / 'bench.sqlite3'
+            self.prepare_database(database, options)
+            paths = self.paths()
+            env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', DJANGO_SETTINGS_MODULE='config.settings')
+            if not options['with_cache']:
+                env['CATALOG_CACHE_BACKEND'] = 'django.core.cache.backends.dummy.DummyCache'
+
+            results = {}
+            for name, command, async_views in SERVERS:
+                port = self.free_port()
+                args = [sys.executable] + [part.format(threads=options['threads']) for part in command] + [
+                    '--workers', str(options['workers']),
+                ] + (['--bind', f'127.0.0.1:{port}'] if 'gunicorn' in command else ['--port', str(port)])
+                server = subprocess.Popen(args, cwd=settings.BASE_DIR, env=dict(env, ASYNC_CATALOG_VIEWS=async_views),
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                try:
+                    asyncio.run(self.wait_ready(port, paths[0]))
+                    # Прогрев: соединения с базой, импорты, кеш фрагментов
+                    asyncio.run(load(port, paths, min(levels), 2))
+                    results[name] = [asyncio.run(load(port, paths, level, options['duration'])) for level in levels]
+                finally:
+                    server.terminate()
+                    server.wait()
+
+        self.stdout.write(f"{options['products']} продуктов, {options['workers']} процесса сервера, "
+                          f"{options['duration']:g} с на уровень; req/s, p50/p95 в мс, ошибки")
+        for name, rows in results.items():
+            self.stdout.write(name)
+            for level, row in zip(levels, rows):
+                self.stdout.write(f"  {level:>4} соединений: {row['rps']:>8.1f} req/s  "
+                                  f"p50 {row['p50']:>7.1f}  p95 {row['p95']:>7.1f}  ошибок {row['errors']}")
+
+    def prepare_database(self, database, options):
+        connection.close()
+        old_name = connection.settings_dict['NAME']
+        connection.settings_dict['NAME'] = str(database)
+        try:
+            call_command('migrate', verbosity=0)
+            SerializerBenchmark().seed(options['products'], random.Random(options['seed']))
+        finally:
+            connection.close()
+            connection.settings_dict['NAME'] = old_name
+
+    def paths(self):
+        """Смесь запросов клиента: страницы списка, карточки, категории и типы"""
+        return [
+            '/api/v1/categories/', '/api/v1/types/',
+            '/api/v1/products/?page=1', '/api/v1/products/?page=7&page_size=20&sort=weight',
+            '/api/v1/products/?view=compact&cursor=&page_size=50',
+        ] + [f'/api/v1/products/{pk}/' for pk in range(1, 11)]
+
+    @staticmethod
+    def free_port():
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    @staticmethod
+    async def wait_ready(port, path, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            except OSError:
+                await asyncio.sleep(0.2)
+                continue
+            status, _ = await request(reader, writer, path)
+            writer.close()
+            if status != 200:
+                raise CommandError(f'Сервер ответил {status} на {path}')
+            return
+        raise CommandError('Сервер не запустился')
+
+
+def host():
+    # С DEBUG и непустым ALLOWED_HOSTS localhost не разрешён
+    return next((name for name in settings.ALLOWED_HOSTS if '*' not in name), 'localhost')
+
+
+async def request(reader, writer, path):
+    """GET по keep-alive соединению: (статус, закрыл ли сервер соединение)"""
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host()}\r\nAccept: application/json\r\n\r\n'.encode())
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    status = int(head[0].split()[1])
+    headers = {}
+    for line in head[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get('connection') == 'close'
+
+
+async def load(port, paths, concurrency, duration):
+    """concurrency соединений непрерывно шлют запросы duration секунд"""
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client(offset):
+        nonlocal errors
+        reader = writer = None
+        i = offset
+        while time.monotonic() < deadline:
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                started = time.monotonic()
+                status, closed = await request(reader, writer, paths[i % len(paths)])
+                latencies.append(time.monotonic() - started)
+                if status != 200:
+                    errors += 1
+                if closed:
+                    writer.close()
+                    writer = None
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                errors += 1
+                writer = None
+            i += 1
+        if writer is not None:
+            writer.close()
+
+    started = time.monotonic()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    elapsed = time.monotonic() - started
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {'rps': len(latencies) / elapsed, 'p50': percentile(0.5), 'p95': percentile(0.95), 'errors': errors}
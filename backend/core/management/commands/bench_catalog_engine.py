@@ -0,0 +1,103 @@
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+from django.test.client import RequestFactory
+from django.utils import timezone
+
+from core.engine import catalog_engine, forget_engines
+from core.management.commands.bench_product_queries import QUERY_SHAPES, Command as QueryBenchmark, percentile
+from core.models import Product
+from core.views import ProductListCreateView
+
+# Комбинации, которые движок берёт на себя; поиск и текстовые фильтры всегда идут через SQL
+ENGINE_SHAPES = QUERY_SHAPES + [
+    ('type + in_stock, page 20', lambda ctx: {'type': ctx['type_id'], 'in_stock': 'true', 'page': 20}),
+    ('volume range + sort=-weight', lambda ctx: {'volume_min': 5, 'volume_max': 30, 'sort': 'weight',
+                                                 'order': 'desc', 'view': 'compact'}),
+]
+
+
+class Command(BaseCommand):
+    help = ('GET /products/ через SQL и через движок каталога в памяти (core/engine.py) на временной '
+            'базе SQLite с 10 тыс., 100 тыс. и 1 млн продуктов: p50/p95 по комбинациям фильтров, '
+            'время полной загрузки снимка и догрузки после изменения 1000 продуктов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000', help='Размеры каталога через запятую')
+        parser.add_argument('--repeat', type=int, default=30, help='Запросов на каждую комбинацию')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        read_alias = settings.CATALOG_READ_DATABASE
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('Нужна база SQLite')
+        sizes = [int(size) for size in options['sizes'].split(',')]
+
+        # Без кеша ответов: версия каталога всегда одна, снимок движка не перечитывается
+        caches = {**settings.CACHES,
+                  settings.CATALOG_CACHE_ALIAS: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        names = {alias: connections.settings[alias]['NAME'] for alias in {DEFAULT_DB_ALIAS, read_alias}}
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as directory, override_settings(CACHES=caches):
+                connections.close_all()
+                for alias in names:
+                    connections.settings[alias]['NAME'] = str(Path(directory) / 'bench.sqlite3')
+                try:
+                    call_command('migrate', verbosity=0)
+                    ctx = QueryBenchmark().seed(size, random.Random(options['seed']))
+                    self.report(size, ctx, read_alias, options['repeat'])
+                finally:
+                    forget_engines()
+                    connections.close_all()
+                    for alias, name in names.items():
+                        connections.settings[alias]['NAME'] = name
+
+    def report(self, size, ctx, read_alias, repeat):
+        with override_settings(CATALOG_ENGINE=True):
+            engine = catalog_engine(read_alias)
+            started = time.perf_counter()
+            snapshot = engine.snapshot()
+            load = (time.perf_counter() - started) * 1000
+
+            pks = list(Product.objects.order_by('?').values_list('pk', flat=True)[:1000])
+            Product.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+            started = time.perf_counter()
+            engine._reload(snapshot, snapshot.version)
+            reload = (time.perf_counter() - started) * 1000
+
+        sql = self.measure(ctx, repeat, engine=False)
+        fast = self.measure(ctx, repeat, engine=True)
+
+        self.stdout.write(f'\n{size} продуктов, {repeat} запросов на комбинацию, мс')
+        self.stdout.write(f'загрузка снимка {load:.0f}, догрузка 1000 изменений {reload:.0f}')
+        self.stdout.write(f"{'комбинация':<30} {'SQL p50':>9} {'SQL p95':>9} {'движок p50':>11} "
+                          f"{'движок p95':>11} {'ускорение':>10}")
+        for name, _ in ENGINE_SHAPES:
+            self.stdout.write(
+                f"{name:<30} {sql[name][0]:>9.2f} {sql[name][1]:>9.2f} {fast[name][0]:>11.2f} "
+                f"{fast[name][1]:>11.2f} {sql[name][0] / fast[name][0]:>9.1f}x"
+            )
+
+    def measure(self, ctx, repeat, engine):
+        factory = RequestFactory()
+        view = ProductListCreateView.as_view()
+        results = {}
+        with override_settings(CATALOG_ENGINE=engine):
+            for name, build in ENGINE_SHAPES:
+                # Первый запрос не считаем: строится перестановка сортировки, прогревается кеш страниц SQLite
+                view(factory.get('/api/v1/products/', build(ctx))).render()
+                samples = []
+                for _ in range(repeat):
+                    request = factory.get('/api/v1/products/', build(ctx))
+                    started = time.perf_counter()
+                    view(request).render()
+                    samples.append((time.perf_counter() - started) * 1000)
+                results[name] = (percentile(samples, 50), percentile(samples, 95))
+        return results
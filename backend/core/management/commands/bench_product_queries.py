@@ -0,0 +1,130 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.models.functions import Mod
+from django.test import override_settings
+from django.test.client import RequestFactory
+from django.utils import timezone
+
+from core.cache import catalog_cache
+from core.models import Category, Type, Product
+from core.views import ProductListCreateView
+
+
+QUERY_SHAPES = [
+    ('type', lambda ctx: {'type': ctx['type_id']}),
+    ('category', lambda ctx: {'category': ctx['category_id']}),
+    ('type + sort=-created_at', lambda ctx: {'type': ctx['type_id'], 'sort': 'created_at', 'order': 'desc'}),
+    ('type + sort=product_name', lambda ctx: {'type': ctx['type_id'], 'sort': 'product_name'}),
+    ('volume range', lambda ctx: {'volume_min': 10, 'volume_max': 12}),
+    ('throat_diameter', lambda ctx: {'throat_diameter': 38}),
+    ('weight range + sort=weight', lambda ctx: {'weight_min': 100, 'weight_max': 105, 'sort': 'weight'}),
+    ('created_at range', lambda ctx: {'created_at_min': ctx['created_from']}),
+    ('updated_at range', lambda ctx: {'updated_at_min': ctx['created_from']}),
+    ('sort=product_name', lambda ctx: {'sort': 'product_name'}),
+    ('sort=-updated_at, page 50', lambda ctx: {'sort': 'updated_at', 'order': 'desc', 'page': 50}),
+]
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+
+
+class Command(BaseCommand):
+    help = ('Заполняет временную тестовую базу продуктами и измеряет p50/p95 задержки '
+            'GET /products/ для каждой комбинации фильтров без индексов Product.Meta.indexes и с ними')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=30, help='Запросов на каждую комбинацию')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        # Работаем только с временной базой, как тестовый раннер, рабочие данные не трогаем
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # create_test_db переключает только default; чтение каталога (core.db.read_database) —
+        # через него же, иначе алиас CATALOG_READ_DATABASE читал бы рабочую базу
+        read_override = override_settings(CATALOG_READ_DATABASE=DEFAULT_DB_ALIAS)
+        read_override.enable()
+        try:
+            ctx = self.seed(options['products'], random.Random(options['seed']))
+            indexes = Product._meta.indexes
+
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(Product, index)
+            before = self.measure(ctx, options['repeat'])
+
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.add_index(Product, index)
+            after = self.measure(ctx, options['repeat'])
+        finally:
+            read_override.disable()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(f"{options['products']} продуктов, {options['repeat']} запросов на комбинацию, мс")
+        self.stdout.write(f"{'комбинация':<30} {'p50 до':>9} {'p95 до':>9} {'p50 после':>10} {'p95 после':>10}")
+        for name, _ in QUERY_SHAPES:
+            self.stdout.write(
+                f"{name:<30} {before[name][0]:>9.2f} {before[name][1]:>9.2f} "
+                f"{after[name][0]:>10.2f} {after[name][1]:>10.2f}"
+            )
+
+    def seed(self, count, rnd):
+        categories = Category.objects.bulk_create(
+            [Category(category_name=f'Категория {i}') for i in range(5)]
+        )
+        types = Type.objects.bulk_create(
+            [Type(type_name=f'Тип {i}', category=categories[i % len(categories)]) for i in range(40)]
+        )
+        batch = []
+        for i in range(count):
+            batch.append(Product(
+                product_name=f'Продукт {rnd.randrange(count * 10)} {i}',
+                type=types[rnd.randrange(len(types))],
+                throat_diameter=rnd.choice([18, 24, 28, 38, 48, 53, 63, 100]),
+                package_volume=rnd.randrange(1, 40),
+                weight=rnd.randrange(5, 2000),
+                in_stock=rnd.random() < 0.8,
+                article_number=f'BENCH-{i}',
+                description='Описание продукта ' * 5,
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+
+        # auto_now/auto_now_add перезаписываются при вставке, разносим даты отдельными UPDATE
+        now = timezone.now()
+        products = Product.objects.annotate(bucket=Mod('id', 365))
+        for day in range(365):
+            moment = now - timedelta(days=day)
+            products.filter(bucket=day).update(created_at=moment, updated_at=moment)
+
+        return {
+            'type_id': types[0].id,
+            'category_id': categories[0].id,
+            'created_from': (now - timedelta(days=7)).isoformat(),
+        }
+
+    def measure(self, ctx, repeat):
+        factory = RequestFactory()
+        view = ProductListCreateView.as_view()
+        results = {}
+        for name, build in QUERY_SHAPES:
+            samples = []
+            for _ in range(repeat):
+                # Измеряем запросы к базе, а не попадания в кеш ответов
+                catalog_cache().clear()
+                request = factory.get('/api/v1/products/', build(ctx))
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                samples.append((time.perf_counter() - started) * 1000)
+            results[name] = (percentile(samples, 50), percentile(samples, 95))
+        return results
@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import Category, Type, Product, ProductColor, ProductImage
+from core.representation import FastProductSerializer
+from core.serializers import product_representation
+
+CASES = [
+    ('full', {}),
+    ('compact', {'view': 'compact'}),
+    ('fields=id,product_name,type', {'fields': 'id,product_name,type'}),
+]
+
+
+class Command(BaseCommand):
+    help = ('Заполняет временную тестовую базу и измеряет время сериализации 1000 продуктов: '
+            'ProductSerializer против быстрого пути core/representation.py (запросы к базе включены)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.seed(options['products'], random.Random(options['seed']))
+            results = [(name, self.measure(params, options['repeat'])) for name, params in CASES]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        per = 1000 / options['products']
+        self.stdout.write(f"{options['products']} продуктов, лучшее из {options['repeat']}, мс на 1000 продуктов")
+        self.stdout.write(f"{'представление':<30} {'DRF':>9} {'быстрый':>9} {'ускорение':>10}")
+        for name, (drf, fast) in results:
+            self.stdout.write(f"{name:<30} {drf * per:>9.2f} {fast * per:>9.2f} {drf / fast:>9.1f}x")
+
+    def seed(self, count, rnd):
+        category = Category.objects.create(category_name='Категория')
+        types = Type.objects.bulk_create([Type(type_name=f'Тип {i}', category=category) for i in range(20)])
+        colors = ProductColor.objects.bulk_create([ProductColor(color=f'#{i:06X}') for i in range(10)])
+        Product.objects.bulk_create([
+            Product(product_name=f'Продукт {i}', type=rnd.choice(types), package_volume=rnd.randrange(1, 40),
+                    weight=rnd.randrange(5, 2000), description='Описание продукта ' * 5, article_number=f'B-{i}')
+            for i in range(count)
+        ])
+        products = list(Product.objects.values_list('pk', flat=True))
+        ProductImage.objects.bulk_create([
+            ProductImage(product_id=pk, image=f'images/{pk}_{j}.jpg', status='ready', variants={
+                'source': f'images/{pk}_{j}.jpg',
+                'formats': {'webp': {str(w): f'images/variants/{pk}_{j}_{w}.webp' for w in (160, 480, 960)}},
+            })
+            for pk in products for j in range(2)
+        ])
+        Product.colors.through.objects.bulk_create([
+            Product.colors.through(product_id=pk, productcolor_id=color.pk)
+            for pk in products for color in rnd.sample(colors, 3)
+        ])
+
+    def measure(self, params, repeat):
+        serializer_class, fields = product_representation(params)
+        products = Product.objects.order_by('id')
+
+        def drf():
+            return serializer_class(products.for_read(fields), many=True, fields=fields).data
+
+        def fast():
+            serializer = FastProductSerializer(serializer_class, fields)
+            return serializer.serialize(serializer.values(products))
+
+        return self.best(drf, repeat), self.best(fast, repeat)
+
+    @staticmethod
+    def best(func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return min(samples)
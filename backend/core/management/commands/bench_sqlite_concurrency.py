@@ -0,0 +1,137 @@
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from core.management.commands.bench_product_serializers import Command as SerializerBenchmark
+from core.models import Product
+from core.representation import FastProductSerializer
+
+
+class Command(BaseCommand):
+    help = ('Чтение каталога во время записи на SQLite: задержки чтения через алиас CATALOG_READ_DATABASE '
+            'без записи и во время длинных транзакций записи (как импорт или действие админки), '
+            'в режиме журнала DELETE (по умолчанию SQLite) и WAL. База — временный файл.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--readers', type=int, default=4, help='Потоков чтения')
+        parser.add_argument('--duration', type=float, default=5, help='Секунд на каждый замер')
+        parser.add_argument('--transaction-time', type=float, default=0.5,
+                            help='Сколько секунд держится каждая транзакция записи')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        read_alias = settings.CATALOG_READ_DATABASE
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite' or read_alias == DEFAULT_DB_ALIAS:
+            raise CommandError('Нужна база SQLite и отдельный алиас CATALOG_READ_DATABASE')
+
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            database = str(Path(directory) / 'bench.sqlite3')
+            connections.close_all()
+            names = {alias: connections.settings[alias]['NAME'] for alias in (DEFAULT_DB_ALIAS, read_alias)}
+            for alias in names:
+                connections.settings[alias]['NAME'] = database
+            try:
+                call_command('migrate', verbosity=0)
+                SerializerBenchmark().seed(options['products'], random.Random(options['seed']))
+                connections.close_all()
+                for mode in ('delete', 'wal'):
+                    with override_settings(SQLITE_PRAGMAS={**settings.SQLITE_PRAGMAS, 'journal_mode': mode}):
+                        for writing in (False, True):
+                            results.append((mode, writing, self.measure(read_alias, writing, options)))
+                        connections.close_all()
+            finally:
+                connections.close_all()
+                for alias, name in names.items():
+                    connections.settings[alias]['NAME'] = name
+
+        self.stdout.write(f"{options['products']} продуктов, {options['readers']} потока чтения, "
+                          f"транзакции записи по {options['transaction_time']:g} с; задержки чтения в мс")
+        self.stdout.write(f"{'журнал':<8} {'запись':<7} {'чтений/с':>9} {'p50':>7} {'p95':>7} {'max':>8} "
+                          f"{'locked':>7} {'коммитов':>9}")
+        for mode, writing, row in results:
+            self.stdout.write(
+                f"{mode:<8} {'да' if writing else 'нет':<7} {row['rps']:>9.1f} {row['p50']:>7.1f} "
+                f"{row['p95']:>7.1f} {row['max']:>8.1f} {row['locked']:>7} {row['commits']:>9}"
+            )
+
+    def measure(self, read_alias, writing, options):
+        deadline = time.monotonic() + options['duration']
+        latencies, stats = [], {'locked': 0, 'commits': 0}
+        lock = threading.Lock()
+        types = list(Product.objects.values_list('type_id', flat=True).distinct())
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            mode = cursor.fetchone()[0]
+        if mode != settings.SQLITE_PRAGMAS['journal_mode']:
+            raise CommandError(f'Не удалось включить журнал {settings.SQLITE_PRAGMAS["journal_mode"]}: {mode}')
+
+        def reader(seed):
+            rnd = random.Random(seed)
+            fast = FastProductSerializer(using=read_alias)
+            try:
+                while time.monotonic() < deadline:
+                    # Страница списка продуктов, как в ProductListCreateView: количество и 20 строк
+                    products = Product.objects.using(read_alias).filter(type_id=rnd.choice(types)).order_by('id')
+                    started = time.monotonic()
+                    try:
+                        products.count()
+                        fast.serialize(fast.values(products)[:20])
+                    except OperationalError:
+                        with lock:
+                            stats['locked'] += 1
+                        continue
+                    with lock:
+                        latencies.append(time.monotonic() - started)
+            finally:
+                connections.close_all()
+
+        def writer():
+            # Длинная транзакция: пачки UPDATE с паузами на обработку между ними, как при импорте
+            pks = list(Product.objects.values_list('pk', flat=True))
+            chunks = [pks[i:i + 100] for i in range(0, len(pks), 100)]
+            pause = options['transaction_time'] / len(chunks)
+            try:
+                while time.monotonic() < deadline:
+                    try:
+                        with transaction.atomic():
+                            for chunk in chunks:
+                                Product.objects.filter(pk__in=chunk).update(
+                                    description=f'Импорт {time.monotonic()} ' * 20, updated_at=timezone.now())
+                                time.sleep(pause)
+                    except OperationalError:
+                        with lock:
+                            stats['locked'] += 1
+                        continue
+                    with lock:
+                        stats['commits'] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(options['readers'])]
+        if writing:
+            threads.append(threading.Thread(target=writer))
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+        return {'rps': len(latencies) / elapsed, 'p50': percentile(0.5), 'p95': percentile(0.95),
+                'max': latencies[-1] * 1000 if latencies else 0.0, **stats}
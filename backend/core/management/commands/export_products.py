@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importexport import RowWriter, detect_format, export_rows
+from core.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Выгружает продукты в CSV/XLSX в формате, который принимает import_products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'xlsx'], help='По умолчанию — по расширению файла')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            fmt = detect_format(options['path'], options['format'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        # iterator() с chunk_size подгружает цвета пачками и не держит весь каталог в памяти
+        products = Product.objects.select_related('type__category').prefetch_related('colors') \
+            .order_by('id').iterator(chunk_size=options['chunk_size'])
+
+        started = time.perf_counter()
+        rows = 0
+        try:
+            with RowWriter(options['path'], fmt) as writer:
+                for row in export_rows(products):
+                    writer.write(row)
+                    rows += 1
+        except (OSError, ImportError) as error:
+            raise CommandError(error)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено {rows} строк за {elapsed:.2f} с ({rows / elapsed if elapsed else 0:.0f} строк/с)'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.jobs import enqueue_image, needs_processing, run_job_inline
+from core.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = ('Ставит в очередь изображения без производных (миниатюры, WebP/AVIF); '
+            'с --sync обрабатывает их сразу в текущем процессе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Пересоздать производные для всех изображений')
+        parser.add_argument('--sync', action='store_true', help='Не ставить в очередь, а обработать сразу')
+
+    def handle(self, *args, **options):
+        jobs = []
+        for product_image in ProductImage.objects.exclude(image='').exclude(image=None).iterator():
+            if options['force']:
+                product_image.variants = {}
+            if needs_processing(product_image):
+                # С --sync задачи выполняются ниже, а не ещё раз через on_commit в режиме IMAGE_JOBS_EAGER
+                jobs.append(enqueue_image(product_image, eager=False if options['sync'] else None))
+
+        if options['sync']:
+            for job in jobs:
+                run_job_inline(job.pk)
+        self.stdout.write(self.style.SUCCESS(f'Изображений в обработке: {len(jobs)}'))
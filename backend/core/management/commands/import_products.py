@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importexport import COLUMNS, ProductImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = ('Импортирует продукты из CSV/XLSX: обновляет существующие по article_number и создаёт новые. '
+            'Колонки: ' + ', '.join(COLUMNS))
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'xlsx'], help='По умолчанию — по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            fmt = detect_format(options['path'], options['format'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        importer = ProductImporter(batch_size=options['batch_size'])
+        started = time.perf_counter()
+        try:
+            importer.run(read_rows(options['path'], fmt))
+        except (OSError, ImportError) as error:
+            raise CommandError(error)
+        elapsed = time.perf_counter() - started
+
+        for error in importer.errors:
+            self.stderr.write(error)
+        rows = importer.created + importer.updated
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {importer.created}, обновлено: {importer.updated}, пропущено: {len(importer.errors)}. '
+            f'{rows} строк за {elapsed:.2f} с ({rows / elapsed if elapsed else 0:.0f} строк/с)'
+        ))
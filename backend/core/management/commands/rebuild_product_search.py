@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import search
+from core.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс продуктов (нужно после bulk_create/update в обход сигналов)'
+
+    def handle(self, *args, **options):
+        if not search.search_available():
+            raise CommandError('FTS5-индекс недоступен: нужна SQLite с FTS5 и миграция 0018_product_search_index')
+        search.rebuild_index(Product.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано продуктов: {Product.objects.count()}'))
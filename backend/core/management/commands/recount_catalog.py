@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.cache import bump_catalog_version
+from core.counters import recount
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики продуктов типов и категорий (product_count, in_stock_count) '
+            'по таблице продуктов: после SQL в обход приложения, loaddata или сбоя')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recount()
+            if fixed:
+                transaction.on_commit(bump_catalog_version)
+        self.stdout.write(self.style.SUCCESS(f'Исправлено строк: {fixed}'))
@@ -0,0 +1,59 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import claim_jobs, complete_job, fail_job, process_image, release_stale_jobs
+
+
+def init_process():
+    # При запуске через spawn (macOS, Windows) дочерний процесс настраивает Django заново
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = ('Обрабатывает очередь изображений (таблица ImageJob): генерирует миниатюры и WebP/AVIF '
+            'в пуле процессов, повторяет неудачные задачи с паузой')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Размер пула процессов')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать готовые задачи и выйти, не дожидаясь новых')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        # Соединения с базой не должны наследоваться дочерними процессами
+        connections.close_all()
+
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_process) as pool:
+            try:
+                while True:
+                    release_stale_jobs()
+                    jobs = claim_jobs(processes)
+                    if not jobs:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+                    self.run_batch(pool, jobs)
+            except KeyboardInterrupt:
+                self.stdout.write('Остановка воркера')
+
+    def run_batch(self, pool, jobs):
+        futures = {pool.submit(process_image, job.source): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                variants = future.result()
+            except Exception as error:
+                fail_job(job, repr(error))
+                self.stderr.write(f'Задача {job.pk} ({job.source}), попытка {job.attempts}: {error!r}')
+            else:
+                complete_job(job, variants)
+                self.stdout.write(f'Задача {job.pk} ({job.source}) выполнена')
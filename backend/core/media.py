@@ -0,0 +1,121 @@
+import mimetypes
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .images import is_hashed_name
+
+# Имя по содержимому (core/images.py) не меняет содержимое — кешируется браузером и CDN навсегда.
+# Старые файлы с обычными именами могли бы смениться под тем же URL, для них срок короче.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=86400'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Один диапазон из заголовка Range: (start, end) включительно или None — отдать файл целиком
+    (нет заголовка, несколько диапазонов, неверный синтаксис). Диапазон за концом файла —
+    RangeNotSatisfiable.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable(header)
+        start, end = max(0, size - suffix), size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_media(request, path):
+    """
+    Отдача MEDIA_ROOT: ETag/Last-Modified и 304, долгий Cache-Control, запросы диапазонов (206).
+    С MEDIA_ACCEL_REDIRECT файл передаётся фронтовому nginx заголовком X-Accel-Redirect,
+    и Django не читает его вовсе.
+    """
+    try:
+        full_path = Path(safe_join(settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not full_path.is_file():
+        raise Http404('Файл не найден')
+
+    stat = full_path.stat()
+    last_modified = int(stat.st_mtime)
+    etag = f'"{last_modified:x}-{stat.st_size:x}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if is_hashed_name(path) else DEFAULT_CACHE_CONTROL,
+        'Accept-Ranges': 'bytes',
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type = mimetypes.guess_type(full_path.name)[0] or 'application/octet-stream'
+        response = _file_response(request, full_path, path, stat.st_size, content_type, headers)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _file_response(request, full_path, path, size, content_type, headers):
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # nginx сам обработает Range и отдаст файл через sendfile
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT + quote(path)
+        return response
+
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None or if_range in (headers['ETag'], headers['Last-Modified']):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE', ''), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        # FileResponse отдаётся через wsgi.file_wrapper (sendfile у gunicorn)
+        return FileResponse(open(full_path, 'rb'), content_type=content_type)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(read_range(full_path, start, end - start + 1),
+                                     status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
@@ -0,0 +1,212 @@
+import contextvars
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class Histogram:
+    """Гистограмма Prometheus с метками; значения накапливаются в памяти процесса"""
+
+    def __init__(self, name, documentation, buckets, labels):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            # Ведро «le» считает значения не больше границы, накопительно — при выводе
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = sorted(self.series.items())
+            for labels, values in series:
+                names = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, labels))
+                total = 0
+                for bound, count in zip(self.buckets, values['buckets']):
+                    total += count
+                    lines.append(f'{self.name}_bucket{{{names},le="{bound}"}} {total}')
+                lines.append(f'{self.name}_bucket{{{names},le="+Inf"}} {values["count"]}')
+                lines.append(f'{self.name}_sum{{{names}}} {values["sum"]:.6f}')
+                lines.append(f'{self.name}_count{{{names}}} {values["count"]}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Время обработки запроса',
+                             DURATION_BUCKETS, ('route', 'method', 'status'))
+DB_QUERIES = Histogram('http_request_db_queries', 'Число SQL-запросов на запрос',
+                       QUERY_BUCKETS, ('route', 'method'))
+DB_DURATION = Histogram('http_request_db_duration_seconds', 'Время SQL-запросов на запрос',
+                        DURATION_BUCKETS, ('route', 'method'))
+SERIALIZE_DURATION = Histogram('http_request_serialize_duration_seconds',
+                               'Время сериализации и рендеринга ответа', DURATION_BUCKETS, ('route', 'method'))
+RESPONSE_BYTES = Histogram('http_response_size_bytes', 'Размер тела ответа (после сжатия)',
+                           BYTES_BUCKETS, ('route', 'method'))
+METRICS = [REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZE_DURATION, RESPONSE_BYTES]
+
+
+class RequestMetrics:
+    """Счётчики одного запроса; как обёртка execute_wrapper считает SQL-запросы и их время"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.phases = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+@contextmanager
+def phase(name):
+    """Время участка обработки текущего запроса (serialize, render) для метрик и Server-Timing"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.phases[name] = metrics.phases.get(name, 0.0) + time.perf_counter() - started
+
+
+def server_timing(metrics, total):
+    entries = [f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"']
+    entries += [f'{name};dur={duration * 1000:.1f}' for name, duration in metrics.phases.items()]
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def response_size(response):
+    if not response.streaming:
+        return len(response.content)
+    length = response.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+
+class MetricsMiddleware:
+    """
+    Метрики запросов по маршрутам: время ответа, число и время SQL-запросов (все алиасы баз),
+    время сериализации и рендеринга, размер ответа. Отдаются на /metrics (metrics_view),
+    с METRICS_SERVER_TIMING — ещё и заголовком Server-Timing; запросы дольше
+    SLOW_REQUEST_MS пишутся в журнал. Стоит первым в MIDDLEWARE, чтобы учитывать всю обработку.
+
+    Поддерживает и синхронную, и асинхронную цепочку: под ASGI Django не оборачивает её
+    в SyncToAsync, и асинхронные представления (core/async_views.py) остаются в цикле событий.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                wrap_connections(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            # ORM из асинхронного кода работает в потоке sync_to_async запроса (ThreadSensitiveContext
+            # ASGIHandler), соединения у потока свои — обёртку ставим и снимаем в том же потоке
+            with ExitStack() as stack:
+                await sync_to_async(wrap_connections)(stack, metrics)
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        return self.record(request, response, metrics)
+
+    def record(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name == 'metrics':
+            return response
+        labels = (match.route if match is not None else UNMATCHED_ROUTE, request.method)
+        REQUEST_DURATION.observe(labels + (str(response.status_code),), total)
+        DB_QUERIES.observe(labels, metrics.queries)
+        DB_DURATION.observe(labels, metrics.db_time)
+        SERIALIZE_DURATION.observe(labels, sum(metrics.phases.values()))
+        size = response_size(response)
+        if size is not None:
+            RESPONSE_BYTES.observe(labels, size)
+
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(metrics, total)
+        if total * 1000 >= settings.SLOW_REQUEST_MS:
+            logger.warning('Медленный запрос %s %s: %d за %.0f мс, SQL: %d запросов, %.0f мс',
+                           request.method, request.get_full_path(), response.status_code, total * 1000,
+                           metrics.queries, metrics.db_time * 1000)
+        return response
+
+
+def wrap_connections(stack, metrics):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics))
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus. С METRICS_TOKEN нужен заголовок Authorization: Bearer"""
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'.encode()
+        if not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', '').encode(), expected):
+            return HttpResponseForbidden()
+    elif request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    lines = [line for metric in METRICS for line in metric.expose()]
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
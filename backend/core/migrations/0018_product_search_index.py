@@ -0,0 +1,58 @@
+from django.db import migrations, OperationalError
+
+# Копия core.search на момент миграции: миграция не должна меняться вместе с кодом
+SEARCH_TABLE = 'core_product_fts'
+SEARCH_FIELDS = [
+    'product_name', 'throat_standard', 'dimensions', 'compound',
+    'material', 'package', 'application', 'description',
+]
+_NORMALIZE = str.maketrans({'ё': 'е', 'Ё': 'Е', 'ʻ': None, 'ʼ': None, '‘': None, '’': None, '`': None, "'": None})
+
+
+def normalize(text):
+    return (text or '').translate(_NORMALIZE)
+
+
+def create_search_index(apps, schema_editor):
+    # Полнотекстовый индекс нужен только на SQLite; без FTS5 поиск q= работает через icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"{', '.join(SEARCH_FIELDS)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    except OperationalError:
+        return
+    # Название важнее всего, описание — меньше всего
+    schema_editor.execute(
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) "
+        f"VALUES ('rank', 'bm25(10.0, 2.0, 1.0, 1.0, 1.0, 1.0, 1.0, 0.5)')"
+    )
+
+    Product = apps.get_model('core', 'Product')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(SEARCH_FIELDS)}) "
+            f"VALUES (%s, {', '.join(['%s'] * len(SEARCH_FIELDS))})",
+            [
+                [row[0]] + [normalize(value) for value in row[1:]]
+                for row in Product.objects.values_list('pk', *SEARCH_FIELDS)
+            ]
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_product_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
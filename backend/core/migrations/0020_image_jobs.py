@@ -0,0 +1,57 @@
+# Generated by Django 4.2 on 2026-10-18 03:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def enqueue_existing_images(apps, schema_editor):
+    # Готовые производные помечаем ready, для остальных изображений ставим задачи в очередь
+    ProductImage = apps.get_model('core', 'ProductImage')
+    ImageJob = apps.get_model('core', 'ImageJob')
+    pending = []
+    for image in ProductImage.objects.exclude(image='').exclude(image=None).only('id', 'image', 'variants'):
+        if image.variants.get('source') == image.image.name:
+            ProductImage.objects.filter(pk=image.pk).update(status='ready')
+        else:
+            pending.append(ImageJob(image_id=image.pk))
+    ImageJob.objects.bulk_create(pending)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_productimage_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('ready', 'Готово'), ('failed', 'Ошибка')], default='pending', editable=False, max_length=10, verbose_name='Обработка'),
+        ),
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='core.productimage')),
+            ],
+            options={
+                'verbose_name': 'Задача обработки изображения',
+                'verbose_name_plural': 'Задачи обработки изображений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='imagejob',
+            index=models.Index(fields=['status', 'run_after'], name='imagejob_status_run_after_idx'),
+        ),
+        migrations.RunPython(enqueue_existing_images, migrations.RunPython.noop),
+    ]
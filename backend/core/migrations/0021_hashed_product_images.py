@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 03:18
+
+import core.models
+import django.core.validators
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_image_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=core.models.HashedImageField(blank=True, null=True, upload_to='images/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])], verbose_name='Изображение'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations, transaction, DatabaseError
+
+# Копия core.search.SEARCH_FIELDS на момент миграции: миграция не должна меняться вместе с кодом
+SEARCH_FIELDS = [
+    'product_name', 'throat_standard', 'dimensions', 'compound',
+    'material', 'package', 'application', 'description',
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # На PostgreSQL поиск q= идёт через icontains (UPPER(поле) LIKE ...), его ускоряют GIN-индексы
+    # триграмм по тому же выражению. На SQLite есть FTS5 (миграция 0018)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        # Нет прав на расширение — поиск работает и без индексов, только медленнее
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS product_{field}_trgm_idx '
+            f'ON core_product USING gin (UPPER({field}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS product_{field}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_hashed_product_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
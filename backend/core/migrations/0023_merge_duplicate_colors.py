@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-18 03:39
+
+import re
+
+from django.db import migrations
+
+# Копия core.colors.normalize_color на момент миграции: миграция не должна меняться вместе с кодом
+HEX_COLOR_RE = re.compile(r'#?([0-9A-F]{3}|[0-9A-F]{6})')
+
+
+def normalize_color(value):
+    match = HEX_COLOR_RE.fullmatch(value.strip().upper())
+    if match is None:
+        raise ValueError(value)
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = ''.join(digit * 2 for digit in digits)
+    return f'#{digits}'
+
+
+def merge_duplicate_colors(apps, schema_editor):
+    # Нормализуем значения ('#ffffff' → '#FFFFFF') и сливаем совпавшие цвета в цвет с меньшим id
+    ProductColor = apps.get_model('core', 'ProductColor')
+    Through = apps.get_model('core', 'Product').colors.through
+    canonical = {}
+    for color in ProductColor.objects.order_by('pk'):
+        try:
+            value = normalize_color(color.color)
+        except ValueError:
+            value = color.color.strip().upper()
+        if value not in canonical:
+            canonical[value] = color.pk
+            if value != color.color:
+                ProductColor.objects.filter(pk=color.pk).update(color=value)
+            continue
+
+        target = canonical[value]
+        linked = Through.objects.filter(productcolor_id=target).values('product_id')
+        Through.objects.filter(productcolor_id=color.pk).exclude(product_id__in=linked).update(productcolor_id=target)
+        Through.objects.filter(productcolor_id=color.pk).delete()
+        color.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_product_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_colors, migrations.RunPython.noop),
+    ]
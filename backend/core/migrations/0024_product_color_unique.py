@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 03:39
+
+import core.colors
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Отдельно от 0023: на PostgreSQL ALTER TABLE нельзя в транзакции с отложенными проверками внешних ключей
+
+    dependencies = [
+        ('core', '0023_merge_duplicate_colors'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productcolor',
+            name='color',
+            field=models.CharField(max_length=7, unique=True, validators=[core.colors.validate_color]),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-18 03:42
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def count_products(apps, schema_editor):
+    Category = apps.get_model('core', 'Category')
+    Type = apps.get_model('core', 'Type')
+    Product = apps.get_model('core', 'Product')
+    counts = {
+        row['type_id']: row for row in Product.objects.values('type_id').annotate(
+            total=Count('pk'), in_stock=Count('pk', filter=Q(in_stock=True)))
+    }
+    for type_id, row in counts.items():
+        Type.objects.filter(pk=type_id).update(product_count=row['total'], in_stock_count=row['in_stock'])
+    for row in Type.objects.values('category_id').annotate(total=Sum('product_count'), in_stock=Sum('in_stock_count')):
+        Category.objects.filter(pk=row['category_id']).update(product_count=row['total'], in_stock_count=row['in_stock'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_product_color_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='in_stock_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В наличии'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Продуктов'),
+        ),
+        migrations.AddField(
+            model_name='type',
+            name='in_stock_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В наличии'),
+        ),
+        migrations.AddField(
+            model_name='type',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Продуктов'),
+        ),
+        migrations.RunPython(count_products, migrations.RunPython.noop),
+    ]
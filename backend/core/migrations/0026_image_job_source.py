@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_catalog_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagejob',
+            name='source',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_image_job_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='counted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='type',
+            name='counted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
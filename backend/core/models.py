@@ -1,6 +1,11 @@
 from django.db import models
+from django.utils import timezone
 from colorfield.fields import ColorField
 from django.core.validators import FileExtensionValidator
+from django.db.models.fields.files import ImageFieldFile
+
+from .colors import cached_color_ids, normalize_color, remember_color_ids, validate_color
+from .images import hashed_name
 
 
 class BaseModel(models.Model):
@@ -11,7 +16,35 @@ class BaseModel(models.Model):
         abstract = True
 
 
-class Category(BaseModel):
+COUNTER_FIELDS = ['product_count', 'in_stock_count']
+
+
+class CountersModel(BaseModel):
+    """
+    Счётчики продуктов категории или типа. Меняются только F-выражениями (core/counters.py),
+    поэтому обычное сохранение объекта их не перезаписывает устаревшими значениями.
+
+    Изменение счётчиков сдвигает counted_at, а не updated_at: updated_at типа и категории входит
+    в ETag и кеш фрагментов каждого продукта, а счётчиков в представлении продукта нет.
+    """
+    product_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Продуктов')
+    in_stock_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='В наличии')
+    counted_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = set(COUNTER_FIELDS) | {'counted_at'} | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class Category(CountersModel):
     category_name = models.CharField(max_length=255, verbose_name='Категория')
 
     class Meta:
@@ -22,7 +55,7 @@ class Category(BaseModel):
         return self.category_name
 
 
-class Type(BaseModel):
+class Type(CountersModel):
     type_name = models.CharField(max_length=255, verbose_name='Тип')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name='Категория')
 
@@ -34,12 +67,65 @@ class Type(BaseModel):
         return self.type_name
 
 
+class ProductColorManager(models.Manager):
+    def resolve(self, colors):
+        """
+        {цвет: id} для нормализованных значений: кеш процесса, один запрос IN на промахи
+        и одна массовая вставка недостающих (параллельную вставку того же цвета пропускает
+        уникальный индекс).
+        """
+        colors = list(dict.fromkeys(colors))
+        color_ids = cached_color_ids(colors)
+        missing = [color for color in colors if color not in color_ids]
+        if missing:
+            found = dict(self.filter(color__in=missing).values_list('color', 'pk'))
+            new = [color for color in missing if color not in found]
+            if new:
+                self.bulk_create([self.model(color=color) for color in new], ignore_conflicts=True)
+                found.update(self.filter(color__in=new).values_list('color', 'pk'))
+            remember_color_ids(found, using=self.db)
+            color_ids.update(found)
+        return color_ids
+
+
 class ProductColor(models.Model):
-    color = models.CharField(max_length=7)  # Например, "#FFFFFF"
+    # Всегда '#RRGGBB' в верхнем регистре (core/colors.py)
+    color = models.CharField(max_length=7, unique=True, validators=[validate_color])  # Например, "#FFFFFF"
+
+    objects = ProductColorManager()
 
     def __str__(self):
         return self.color
 
+    def save(self, *args, **kwargs):
+        self.color = normalize_color(self.color)
+        super().save(*args, **kwargs)
+
+
+class ProductQuerySet(models.QuerySet):
+    def for_read(self, fields=None):
+        """
+        Продукты со всеми связями, нужными ProductSerializer, за постоянное число запросов.
+        С fields (имена полей ответа) — только нужные столбцы и связи.
+        """
+        if fields is None:
+            fields = {'type', 'images', 'colors'}
+            columns = None
+        else:
+            concrete = {field.name for field in self.model._meta.concrete_fields}
+            columns = {'id'} | (set(fields) & concrete)
+
+        queryset = self
+        if {'type', 'category'} & set(fields):
+            queryset = queryset.select_related('type__category')
+            if columns is not None:
+                columns.add('type')
+        if {'images', 'image'} & set(fields):
+            queryset = queryset.prefetch_related(models.Prefetch('images', queryset=ProductImage.objects.order_by('id')))
+        if 'colors' in fields:
+            queryset = queryset.prefetch_related(models.Prefetch('colors', queryset=ProductColor.objects.order_by('id')))
+        return queryset if columns is None else queryset.only(*columns)
+
 
 class Product(BaseModel):
     product_name = models.CharField(max_length=255, verbose_name='Название')
@@ -64,24 +150,89 @@ class Product(BaseModel):
 
     type = models.ForeignKey(Type, on_delete=models.CASCADE)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = 'Продукты'
         verbose_name = 'Продукт'
+        # Индексы повторяют фильтры и сортировки ProductListCreateView и changelist админки.
+        # Для type и type__category индексы уже есть у внешних ключей.
+        indexes = [
+            models.Index(fields=['type', '-created_at'], name='product_type_created_idx'),
+            models.Index(fields=['type', 'product_name'], name='product_type_name_idx'),
+            models.Index(fields=['in_stock', 'type'], name='product_stock_type_idx'),
+            models.Index(fields=['product_name'], name='product_name_idx'),
+            models.Index(fields=['package_volume'], name='product_volume_idx'),
+            models.Index(fields=['throat_diameter'], name='product_throat_diameter_idx'),
+            models.Index(fields=['weight'], name='product_weight_idx'),
+            models.Index(fields=['created_at'], name='product_created_idx'),
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+        ]
 
     def __str__(self):
         return self.product_name
 
 
+class ImageStatus(models.TextChoices):
+    PENDING = 'pending', 'В очереди'
+    READY = 'ready', 'Готово'
+    FAILED = 'failed', 'Ошибка'
+
+
+class HashedImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        super().save(hashed_name(name, content), content, save)
+
+
+class HashedImageField(models.ImageField):
+    """ImageField с именами файлов по содержимому: URL можно кешировать без срока (core/media.py)"""
+    attr_class = HashedImageFieldFile
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="images")
-    image = models.ImageField(
+    image = HashedImageField(
         upload_to='images/',
         blank=True,
         null=True,
         verbose_name='Изображение',
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]
     )
+    # Производные изображения по форматам и ширинам, см. core/images.py
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    status = models.CharField(max_length=10, choices=ImageStatus.choices, default=ImageStatus.PENDING,
+                              editable=False, verbose_name='Обработка')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Image for {self.product.product_name}"
+
+
+class ImageJob(BaseModel):
+    """Задача очереди обработки изображений, её выполняет manage.py run_image_worker"""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    image = models.ForeignKey(ProductImage, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    # Имя файла, который обрабатывает задача: записывается при захвате (core/jobs.py)
+    source = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        verbose_name_plural = 'Задачи обработки изображений'
+        verbose_name = 'Задача обработки изображения'
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='imagejob_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.pk} for image {self.image_id}: {self.status}"
@@ -0,0 +1,158 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPaginator:
+    """
+    Пагинация по курсору (keyset) для продуктов.
+
+    Страница выбирается условием WHERE по паре (поле сортировки, id) последней записи
+    предыдущей страницы, поэтому глубокие страницы стоят столько же, сколько первая,
+    и COUNT(*) не нужен. NULL всегда идут первыми при asc и последними при desc,
+    как в SQLite, но порядок задаётся явно, чтобы не зависеть от СУБД.
+    """
+
+    def __init__(self, queryset, page_size, sort_field='id', descending=False):
+        self.queryset = queryset
+        self.page_size = page_size
+        self.sort_field = sort_field
+        self.descending = descending
+
+    def _ordering(self):
+        if self.sort_field == 'id':
+            return ['-id'] if self.descending else ['id']
+        if self.descending:
+            return [F(self.sort_field).desc(nulls_last=True), '-id']
+        return [F(self.sort_field).asc(nulls_first=True), 'id']
+
+    def _after(self, value, pk):
+        """Условие «строго после (value, pk)» в текущем порядке сортировки"""
+        field = self.sort_field
+        if field == 'id':
+            return Q(id__lt=pk) if self.descending else Q(id__gt=pk)
+
+        if self.descending:
+            if value is None:
+                return Q(**{f'{field}__isnull': True}, id__lt=pk)
+            return (Q(**{f'{field}__lt': value}) | Q(**{field: value}, id__lt=pk)
+                    | Q(**{f'{field}__isnull': True}))
+
+        if value is None:
+            return Q(**{f'{field}__isnull': True}, id__gt=pk) | Q(**{f'{field}__isnull': False})
+        return Q(**{f'{field}__gt': value}) | Q(**{field: value}, id__gt=pk)
+
+    def encode_cursor(self, obj):
+        # Страница — модели или строки .values() (быстрый путь чтения)
+        if isinstance(obj, dict):
+            value, pk = obj[self.sort_field], obj['id']
+        else:
+            value, pk = getattr(obj, self.sort_field), obj.pk
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        raw = json.dumps({'v': value, 'id': pk}, ensure_ascii=False).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            data = json.loads(raw)
+            value, pk = data['v'], int(data['id'])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+
+        if value is None:
+            return value, pk
+        if self.sort_field in ('created_at', 'updated_at'):
+            try:
+                value = parse_datetime(value) if isinstance(value, str) else None
+            except ValueError:
+                value = None
+        elif self.sort_field == 'product_name':
+            value = value if isinstance(value, str) else None
+        elif not isinstance(value, int) or isinstance(value, bool):
+            value = None
+        if value is None:
+            raise InvalidCursor(cursor)
+        return value, pk
+
+    def _page_queryset(self, cursor):
+        queryset = self.queryset.order_by(*self._ordering())
+        if cursor:
+            queryset = queryset.filter(self._after(*self.decode_cursor(cursor)))
+        # Берём на одну запись больше, чтобы узнать о следующей странице без COUNT(*)
+        return queryset[:self.page_size + 1]
+
+    def _split(self, objects):
+        if len(objects) > self.page_size:
+            objects = objects[:self.page_size]
+            return objects, self.encode_cursor(objects[-1])
+        return objects, None
+
+    def page(self, cursor=None):
+        """Возвращает (объекты страницы, курсор следующей страницы или None)"""
+        return self._split(list(self._page_queryset(cursor)))
+
+    async def apage(self, cursor=None):
+        """page() для асинхронных представлений"""
+        return self._split([obj async for obj in self._page_queryset(cursor)])
+
+
+# Разбор параметров и тела ответа GET /products/, общие для views.ProductListCreateView
+# и async_views.ProductListView: запросы к базе каждое представление делает само
+
+def page_size_param(params, default=10):
+    try:
+        page_size = int(params.get('page_size', default))
+    except ValueError:
+        return default
+    return page_size if page_size > 0 else default
+
+
+def numbered_page(paginator, number):
+    """Страница Paginator; нечисловой номер — первая страница, слишком большой — последняя"""
+    try:
+        return paginator.page(number)
+    except PageNotAnInteger:
+        return paginator.page(1)
+    except EmptyPage:
+        return paginator.page(paginator.num_pages)
+
+
+def cursor_data(params, next_cursor, results, count=None, page_size=None):
+    data = {
+        "next_cursor": next_cursor,
+        "next": next_cursor is not None,
+        "type_id": params.get('type') or "All",
+        "results": results
+    }
+    # with_count: COUNT(*) в режиме курсора только по запросу клиента
+    if count is not None:
+        data["count"] = count
+        data["total_pages"] = max(1, -(-count // page_size))
+    return data
+
+
+def page_data(params, page_objects, results):
+    return {
+        "count": page_objects.paginator.count,
+        "total_pages": page_objects.paginator.num_pages,
+        "current_page": page_objects.number,
+        "next": page_objects.has_next(),
+        "previous": page_objects.has_previous(),
+        "type_id": params.get('type') or "All",
+        "results": results
+    }
+
+
+def wants_count(params):
+    return params.get('with_count') in ('1', 'true')
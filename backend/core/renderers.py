@@ -0,0 +1,84 @@
+import json
+import re
+import uuid
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metrics import phase
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость: без неё работает стандартный json
+    orjson = None
+
+
+class Fragment(bytes):
+    """Готовый JSON одного объекта: рендерер вставляет его в ответ без повторного кодирования"""
+
+
+class FragmentEncoder(JSONEncoder):
+    """Кодировщик DRF, который разворачивает Fragment обратно в объект (ответы с отступами)"""
+
+    def default(self, obj):
+        if isinstance(obj, Fragment):
+            return json.loads(obj)
+        return super().default(obj)
+
+
+_drf_default = JSONEncoder().default
+
+
+def _dumps(data, default):
+    """Компактный JSON в байтах, те же байты, что у JSONRenderer DRF с настройками по умолчанию"""
+    if orjson is not None:
+        try:
+            body = orjson.dumps(data, default=default)
+        except (TypeError, orjson.JSONEncodeError):
+            # Целые вне int64 и прочие редкие случаи — стандартным кодировщиком
+            pass
+        else:
+            return body.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    body = json.dumps(data, default=default, ensure_ascii=False, separators=(',', ':'))
+    return body.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def encode_fragment(data):
+    return Fragment(_dumps(data, _drf_default))
+
+
+class CatalogJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer с orjson, если он установлен, и вставкой готовых фрагментов (Fragment)
+    из кеша: страница продуктов собирается склейкой байтов, а не кодированием заново.
+    Ответы с отступами (indent, BrowsableAPI) и нестандартные настройки JSON DRF
+    рендерятся обычным путём с развёрнутыми фрагментами.
+    """
+    encoder_class = FragmentEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with phase('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii or self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Фрагменты заменяются уникальными строками-метками, затем метки — байтами фрагментов
+        token = uuid.uuid4().hex
+        fragments = []
+
+        def default(obj):
+            if isinstance(obj, Fragment):
+                fragments.append(obj)
+                return f'\x00{token}:{len(fragments) - 1}'
+            return _drf_default(obj)
+
+        body = _dumps(data, default)
+        if not fragments:
+            return body
+        placeholder = re.compile(rb'"\\u0000' + token.encode() + rb':(\d+)"')
+        return placeholder.sub(lambda match: fragments[int(match.group(1))], body)
@@ -0,0 +1,217 @@
+import hashlib
+
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+from .cache import catalog_cache
+from .metrics import phase
+from .models import COUNTER_FIELDS, Product, ProductColor, ProductImage
+from .renderers import encode_fragment
+from .serializers import ProductSerializer
+
+# Тот же формат дат, что у полей created_at/updated_at в сериализаторах DRF
+_datetime = serializers.DateTimeField().to_representation
+
+CATEGORY_COLUMNS = ['id', 'category_name', 'product_count', 'in_stock_count', 'created_at', 'updated_at']
+TYPE_COLUMNS = ['id', 'type_name', 'product_count', 'in_stock_count', 'created_at', 'updated_at'] + [
+    f'category__{column}' for column in CATEGORY_COLUMNS
+]
+# Тип и категория внутри продукта — без счётчиков (ProductTypeSerializer)
+PRODUCT_TYPE_COLUMNS = [
+    f'type__{column}' for column in TYPE_COLUMNS if column.rsplit('__', 1)[-1] not in COUNTER_FIELDS
+]
+IMAGE_COLUMNS = ['id', 'product_id', 'image', 'status', 'variants']
+# Всё, от чего зависит представление продукта: изображения и цвета сдвигают его updated_at (core/signals.py)
+FRAGMENT_VERSION_COLUMNS = ['updated_at', 'type__updated_at', 'type__category__updated_at']
+
+
+def category_representation(row, prefix='', counters=True):
+    """
+    То же, что CategorySerializer, из строки .values() со столбцами CATEGORY_COLUMNS;
+    с counters=False — без счётчиков, как категория внутри продукта
+    """
+    data = {'id': row[f'{prefix}id'], 'category_name': row[f'{prefix}category_name']}
+    if counters:
+        data.update({field: row[f'{prefix}{field}'] for field in COUNTER_FIELDS})
+    data['created_at'] = _datetime(row[f'{prefix}created_at'])
+    data['updated_at'] = _datetime(row[f'{prefix}updated_at'])
+    return data
+
+
+def type_representation(row, prefix='', counters=True):
+    """То же, что TypeSerializer (с counters=False — ProductTypeSerializer) из строки .values()"""
+    data = {
+        'id': row[f'{prefix}id'],
+        'type_name': row[f'{prefix}type_name'],
+        'category': category_representation(row, f'{prefix}category__', counters),
+    }
+    if counters:
+        data.update({field: row[f'{prefix}{field}'] for field in COUNTER_FIELDS})
+    data['created_at'] = _datetime(row[f'{prefix}created_at'])
+    data['updated_at'] = _datetime(row[f'{prefix}updated_at'])
+    return data
+
+
+def image_representation(row, request=None):
+    """То же, что ProductImageSerializer, из строки .values() со столбцами IMAGE_COLUMNS"""
+    def url(name):
+        url = default_storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    name = row['image']
+    variants = row['variants']
+    formats = variants.get('formats', {}) if name and variants.get('source') == name else {}
+    urls = {
+        fmt: {width: url(file) for width, file in names.items()}
+        for fmt, names in formats.items()
+    }
+    return {
+        'id': row['id'],
+        'image': url(name) if name else None,
+        'status': row['status'],
+        'variants': urls,
+        'srcset': {
+            fmt: ', '.join(f'{url} {width}w' for width, url in by_width.items())
+            for fmt, by_width in urls.items()
+        },
+    }
+
+
+class FastProductSerializer:
+    """
+    Быстрый путь чтения: словари ответа строятся из строк .values() и карт связей
+    (изображения, цвета) без полей DRF и без создания моделей. Результат совпадает
+    с ProductSerializer/ProductListSerializer с теми же fields, что проверяется тестом.
+
+    С encoded=True продукты отдаются готовыми JSON-фрагментами из кеша каталога с ключом
+    (id, updated_at продукта, типа и категории, набор полей); для них не нужны ни
+    изображения, ни цвета, кодируются и запрашиваются только промахи.
+
+    aserialize() — то же для асинхронных представлений (core/async_views.py).
+    """
+
+    def __init__(self, serializer_class=ProductSerializer, fields=None, request=None, encoded=False, using=None):
+        self.request = request
+        self.using = using
+        self.encoded = encoded
+        self.fields = [
+            name for name in serializer_class.Meta.fields
+            if name != 'type_id' and (fields is None or name in fields)
+        ]
+        wanted = set(self.fields)
+        concrete = {field.name for field in Product._meta.concrete_fields} - {'type'}
+        self.columns = ['id'] + [name for name in self.fields if name in concrete and name != 'id']
+        if {'type', 'category'} & wanted:
+            self.columns += PRODUCT_TYPE_COLUMNS
+        self.with_images = bool({'images', 'image'} & wanted)
+        self.with_colors = 'colors' in wanted
+        if encoded:
+            self.columns += FRAGMENT_VERSION_COLUMNS
+            base = request.build_absolute_uri('/') if request is not None else ''
+            self.signature = hashlib.md5(f"{base}|{','.join(self.fields)}".encode()).hexdigest()
+
+    def values(self, queryset, extra=()):
+        """Строки для сериализации; extra — дополнительные столбцы, например поле сортировки курсора"""
+        return queryset.values(*dict.fromkeys(self.columns + list(extra)))
+
+    def _related_querysets(self, ids):
+        """Изображения и цвета страницы: по одному запросу на связь"""
+        images = colors = None
+        if self.with_images:
+            images = ProductImage.objects.using(self.using).filter(product_id__in=ids).order_by('id').values(*IMAGE_COLUMNS)
+        if self.with_colors:
+            colors = ProductColor.objects.using(self.using).filter(product__in=ids).order_by('id').values_list('product', 'color')
+        return images, colors
+
+    def _collect(self, image_rows, color_rows):
+        images, colors = {}, {}
+        for row in image_rows or ():
+            images.setdefault(row['product_id'], []).append(image_representation(row, self.request))
+        for product_id, color in color_rows or ():
+            colors.setdefault(product_id, []).append({'color': color})
+        return images, colors
+
+    def _related(self, ids):
+        return self._collect(*self._related_querysets(ids))
+
+    async def _arelated(self, ids):
+        images, colors = self._related_querysets(ids)
+        if images is not None:
+            images = [row async for row in images]
+        if colors is not None:
+            colors = [row async for row in colors]
+        return self._collect(images, colors)
+
+    def _fragment_key(self, row):
+        versions = ':'.join(row[column].isoformat() for column in FRAGMENT_VERSION_COLUMNS)
+        return f"catalog:fragment:{self.signature}:{row['id']}:{versions}"
+
+    def serialize(self, rows):
+        with phase('serialize'):
+            return self._serialize(rows)
+
+    def _serialize(self, rows):
+        rows = list(rows)
+        if not self.encoded:
+            return self._build(rows, self._related([row['id'] for row in rows]))
+
+        cache = catalog_cache()
+        keys = [self._fragment_key(row) for row in rows]
+        cached = cache.get_many(keys)
+        misses = [(key, row) for key, row in zip(keys, rows) if key not in cached]
+        if misses:
+            related = self._related([row['id'] for _, row in misses])
+            built = self._encode(misses, self._build([row for _, row in misses], related))
+            cache.set_many(built)
+            cached.update(built)
+        return [cached[key] for key in keys]
+
+    async def aserialize(self, rows):
+        """serialize() для асинхронных представлений: rows — список или асинхронный QuerySet"""
+        with phase('serialize'):
+            return await self._aserialize(rows)
+
+    async def _aserialize(self, rows):
+        if not isinstance(rows, list):
+            rows = [row async for row in rows]
+        if not self.encoded:
+            return self._build(rows, await self._arelated([row['id'] for row in rows]))
+
+        cache = catalog_cache()
+        keys = [self._fragment_key(row) for row in rows]
+        cached = await cache.aget_many(keys)
+        misses = [(key, row) for key, row in zip(keys, rows) if key not in cached]
+        if misses:
+            related = await self._arelated([row['id'] for _, row in misses])
+            built = self._encode(misses, self._build([row for _, row in misses], related))
+            await cache.aset_many(built)
+            cached.update(built)
+        return [cached[key] for key in keys]
+
+    @staticmethod
+    def _encode(misses, items):
+        return {key: encode_fragment(item) for (key, _), item in zip(misses, items)}
+
+    def _build(self, rows, related):
+        images, colors = related
+        data = []
+        for row in rows:
+            item = {}
+            for name in self.fields:
+                if name == 'type':
+                    item[name] = type_representation(row, 'type__', counters=False)
+                elif name == 'category':
+                    item[name] = {'id': row['type__category__id'],
+                                  'category_name': row['type__category__category_name']}
+                elif name == 'images':
+                    item[name] = images.get(row['id'], [])
+                elif name == 'image':
+                    item[name] = images[row['id']][0] if row['id'] in images else None
+                elif name == 'colors':
+                    item[name] = colors.get(row['id'], [])
+                elif name in ('created_at', 'updated_at'):
+                    item[name] = _datetime(row[name])
+                else:
+                    item[name] = row[name]
+            data.append(item)
+        return data
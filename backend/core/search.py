@@ -0,0 +1,142 @@
+import re
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'core_product_fts'
+
+# Порядок колонок совпадает с весами bm25 в миграции 0018_product_search_index. Миграции 0018 и 0022
+# хранят свою копию списка: новое поле требует новой миграции
+SEARCH_FIELDS = [
+    'product_name', 'throat_standard', 'dimensions', 'compound',
+    'material', 'package', 'application', 'description',
+]
+
+# Узбекская латиница пишется с разными апострофами (oʻ, o‘, o'), а «ё» часто заменяют на «е».
+# Приводим текст к одной форме и при индексации, и при поиске.
+_NORMALIZE = str.maketrans({'ё': 'е', 'Ё': 'Е', 'ʻ': None, 'ʼ': None, '‘': None, '’': None, '`': None, "'": None})
+
+
+def normalize(text):
+    return (text or '').translate(_NORMALIZE)
+
+
+_table_exists = False
+
+
+def search_available():
+    """FTS5-таблица есть только на SQLite, собранном с FTS5 (см. миграцию 0018)"""
+    global _table_exists
+    if connection.vendor != 'sqlite':
+        return False
+    if not _table_exists:
+        _table_exists = SEARCH_TABLE in connection.introspection.table_names()
+    return _table_exists
+
+
+_trigram_installed = None
+
+
+def trigram_available():
+    """pg_trgm на PostgreSQL: GIN-индексы для q= и сортировка по похожести (см. миграцию 0022)"""
+    global _trigram_installed
+    if connection.vendor != 'postgresql':
+        return False
+    if _trigram_installed is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_installed = cursor.fetchone() is not None
+    return _trigram_installed
+
+
+def build_match_expression(query):
+    """Каждое слово запроса — префиксный терм FTS5, все слова должны совпасть"""
+    words = re.findall(r'\w+', normalize(query))
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_product(product):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(SEARCH_FIELDS)}) '
+            f'VALUES (%s, {", ".join(["%s"] * len(SEARCH_FIELDS))})',
+            [product.pk] + [normalize(getattr(product, field)) for field in SEARCH_FIELDS]
+        )
+
+
+def remove_product(product_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [product_id])
+
+
+def _insert_rows(cursor, products):
+    cursor.executemany(
+        f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(SEARCH_FIELDS)}) '
+        f'VALUES (%s, {", ".join(["%s"] * len(SEARCH_FIELDS))})',
+        [
+            [row[0]] + [normalize(value) for value in row[1:]]
+            for row in products.values_list('pk', *SEARCH_FIELDS).iterator()
+        ]
+    )
+
+
+def index_products(products):
+    """Переиндексирует набор продуктов после bulk-операций, которые не отправляют сигналы"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                           [[pk] for pk in products.values_list('pk', flat=True)])
+        _insert_rows(cursor, products)
+
+
+def rebuild_index(products):
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        _insert_rows(cursor, products)
+
+
+def search_products(queryset, query, ranked=True):
+    """
+    Фильтрует продукты по строке поиска q.
+
+    С FTS5 — полнотекстовый поиск по префиксам слов; при ranked=True добавляется
+    аннотация search_rank (bm25, меньше — лучше) и сортировка по ней.
+    Без FTS5 — icontains по тем же полям. На PostgreSQL с pg_trgm условия icontains
+    выполняются по GIN-индексам триграмм, а search_rank — похожесть на название со знаком минус.
+    """
+    expression = build_match_expression(query)
+    if not expression:
+        return queryset
+
+    if not search_available():
+        words = re.findall(r'\w+', query)
+        queryset = queryset.filter(reduce(and_, [
+            reduce(or_, [Q(**{f'{field}__icontains': word}) for field in SEARCH_FIELDS])
+            for word in words
+        ]))
+        if ranked and trigram_available():
+            # contrib.postgres импортирует драйвер PostgreSQL, поэтому только здесь
+            from django.contrib.postgres.search import TrigramWordSimilarity
+            queryset = queryset.annotate(
+                search_rank=TrigramWordSimilarity(query, 'product_name') * -1
+            ).order_by('search_rank', 'id')
+        return queryset
+
+    if ranked:
+        # Соединение с FTS-таблицей: MATCH выполняется один раз на запрос. Коррелированный
+        # подзапрос за rank повторял бы MATCH для каждой строки, квадратично по числу совпадений.
+        # Таблица из extra() попадает только во внешний FROM, поэтому такой queryset нельзя
+        # использовать как подзапрос (pk__in=...) — там нужен ranked=False.
+        table = queryset.model._meta.db_table
+        return queryset.extra(
+            select={'search_rank': f'{SEARCH_TABLE}.rank'},
+            tables=[SEARCH_TABLE],
+            where=[f'{SEARCH_TABLE}.rowid = {table}.id', f'{SEARCH_TABLE} MATCH %s'],
+            params=[expression],
+        ).order_by('search_rank', 'id')
+    return queryset.filter(
+        id__in=RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [expression])
+    )
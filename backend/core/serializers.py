@@ -1,17 +1,58 @@
+import logging
+
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from .colors import normalize_color
+from .filters import ProductFilterError
+from .images import has_variants
 from .models import Category, Type, Product, ProductImage, ProductColor
 
+logger = logging.getLogger(__name__)
+
 
 class ProductColorSerializer(serializers.ModelSerializer):
+    # Без UniqueValidator модели: существующий цвет не ошибка, id находит ProductColor.objects.resolve
+    color = serializers.CharField(max_length=7)
+
+    def validate_color(self, value):
+        try:
+            return normalize_color(value)
+        except ValueError:
+            raise serializers.ValidationError("Неверный цвет, ожидается #RRGGBB")
+
     class Meta:
         model = ProductColor
         fields = ["color"]
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField(read_only=True)
+    srcset = serializers.SerializerMethodField(read_only=True)
+
+    def _url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request', None)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def get_variants(self, obj):
+        """Карта {формат: {ширина: url}}, клиент выбирает наименьший подходящий файл"""
+        # Пока воркер не обработал новый файл, старые производные не отдаём
+        formats = obj.variants.get('formats', {}) if has_variants(obj) else {}
+        return {
+            fmt: {width: self._url(name) for width, name in names.items()}
+            for fmt, names in formats.items()
+        }
+
+    def get_srcset(self, obj):
+        """Готовые значения атрибута srcset для каждого формата"""
+        return {
+            fmt: ', '.join(f'{url} {width}w' for width, url in urls.items())
+            for fmt, urls in self.get_variants(obj).items()
+        }
+
     class Meta:
         model = ProductImage
-        fields = ["id", "image"]
+        fields = ["id", "image", "status", "variants", "srcset"]
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -22,7 +63,8 @@ class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Category
-        fields = ['id', 'category_name', 'created_at', 'updated_at']
+        # Счётчики — столбцы модели (core/counters.py), без запросов на объект
+        fields = ['id', 'category_name', 'product_count', 'in_stock_count', 'created_at', 'updated_at']
 
 
 class TypeSerializer(serializers.ModelSerializer):
@@ -38,11 +80,36 @@ class TypeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Type
+        fields = ['id', 'type_name', 'category', 'category_id', 'product_count', 'in_stock_count',
+                  'created_at', 'updated_at']
+
+
+class ProductCategorySerializer(CategorySerializer):
+    class Meta(CategorySerializer.Meta):
+        # Без счётчиков: они меняются с каждым продуктом категории, а представление продукта
+        # кешируется по updated_at его типа и категории (core/representation.py)
+        fields = ['id', 'category_name', 'created_at', 'updated_at']
+
+
+class ProductTypeSerializer(TypeSerializer):
+    category = ProductCategorySerializer(read_only=True)
+
+    class Meta(TypeSerializer.Meta):
         fields = ['id', 'type_name', 'category', 'category_id', 'created_at', 'updated_at']
 
 
-class ProductSerializer(serializers.ModelSerializer):
-    type = TypeSerializer(read_only=True)
+class SparseFieldsMixin:
+    """Оставляет в ответе только поля из аргумента fields (параметры запроса fields= и expand=)"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    type = ProductTypeSerializer(read_only=True)
     type_id = serializers.PrimaryKeyRelatedField(
         queryset=Type.objects.all(), source='type', write_only=True
     )
@@ -75,17 +142,15 @@ class ProductSerializer(serializers.ModelSerializer):
         # Создаем продукт
         product = Product.objects.create(**validated_data)
         
-        # Создаем или получаем существующие объекты цвета и связываем их с продуктом
-        for color_data in colors_data:
-            color, created = ProductColor.objects.get_or_create(color=color_data['color'])
-            product.colors.add(color)
+        # Все цвета одним поиском (и одной вставкой новых) и одним add
+        if colors_data:
+            color_ids = ProductColor.objects.resolve([color_data['color'] for color_data in colors_data])
+            product.colors.add(*color_ids.values())
             
         return product
         
     def update(self, instance, validated_data):
-        # Логирование входных данных для отладки
-        print("Обновление продукта:", instance.id, instance.product_name)
-        print("Полученные данные:", validated_data)
+        logger.debug("Обновление продукта %s (%s): %s", instance.id, instance.product_name, validated_data)
         
         # Извлекаем colors из validated_data, если они там есть
         colors_data = validated_data.pop('colors', None)
@@ -93,32 +158,20 @@ class ProductSerializer(serializers.ModelSerializer):
         # Проверяем, есть ли поле type в validated_data (через source='type')
         type_obj = validated_data.get('type', None)
         if type_obj:
-            print("Найден тип:", type_obj.id, type_obj.type_name)
             # Устанавливаем тип продукта
             instance.type = type_obj
             # Удаляем поле из validated_data, чтобы избежать двойной установки
             validated_data.pop('type', None)
-        else:
-            print("Тип не найден в данных")
         
         # Обновляем остальные поля продукта
         for attr, value in validated_data.items():
-            print("Устанавливаем", attr, "=", value)
             setattr(instance, attr, value)
         instance.save()
         
-        # Если предоставлены новые цвета, обновляем их
+        # Если предоставлены новые цвета, обновляем их: set() удаляет и добавляет только разницу
         if colors_data is not None:
-            print("Обновляем цвета:", colors_data)
-            # Очищаем существующие цвета
-            instance.colors.clear()
-            
-            # Добавляем новые цвета
-            for color_data in colors_data:
-                color, created = ProductColor.objects.get_or_create(color=color_data['color'])
-                instance.colors.add(color)
-        else:
-            print("Цвета не изменены")
+            color_ids = ProductColor.objects.resolve([color_data['color'] for color_data in colors_data])
+            instance.colors.set(list(color_ids.values()))
                 
         return instance
 
@@ -131,3 +184,65 @@ class ProductSerializer(serializers.ModelSerializer):
             'images', 'type', 'type_id', 'category',
             'created_at', 'updated_at', "in_stock", "article_number",
         ]
+
+
+class ProductListSerializer(ProductSerializer):
+    """
+    Компактное представление для сетки каталога: по умолчанию только DEFAULT_FIELDS
+    и первое изображение, остальные поля продукта добавляются через expand=.
+    """
+    DEFAULT_FIELDS = ['id', 'product_name', 'package_volume', 'in_stock', 'image']
+
+    image = serializers.SerializerMethodField(read_only=True)
+
+    def get_image(self, obj):
+        # images уже отсортированы по id в for_read(), first() сделал бы отдельный запрос
+        images = obj.images.all()
+        return ProductImageSerializer(images[0], context=self.context).data if images else None
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['image']
+
+
+def product_representation(params):
+    """
+    Сериализатор и набор полей ответа по параметрам запроса: view=compact — ProductListSerializer,
+    fields= — только перечисленные поля, expand= — поля в дополнение к набору по умолчанию.
+    Возвращает (serializer_class, fields); fields=None — все поля. Неизвестное поле — ProductFilterError.
+    """
+    view = params.get('view', 'full')
+    if view not in ('full', 'compact'):
+        raise ProductFilterError("Invalid view value")
+    serializer_class = ProductListSerializer if view == 'compact' else ProductSerializer
+
+    readable = set(serializer_class.Meta.fields) - {'type_id'}
+
+    def names(param):
+        values = [name.strip() for name in params.get(param, '').split(',') if name.strip()]
+        unknown = set(values) - readable
+        if unknown:
+            raise ProductFilterError(f"Unknown {param}: {', '.join(sorted(unknown))}")
+        return values
+
+    fields, expand = names('fields'), names('expand')
+    if not fields and not expand and view == 'full':
+        return serializer_class, None
+    if not fields:
+        fields = ProductListSerializer.DEFAULT_FIELDS if view == 'compact' else serializer_class.Meta.fields
+    return serializer_class, set(fields) | set(expand)
+
+
+class ProductBulkItemSerializer(ProductSerializer):
+    """
+    Данные одного продукта в /products/bulk/. Проверки, которым нужны запросы к базе
+    (существование типа, уникальность названия и артикула), выполняются в core/bulk.py
+    сразу для всего пакета, поэтому здесь они отключены.
+    """
+    type_id = serializers.IntegerField(write_only=True)
+    article_number = serializers.CharField(max_length=50, required=False, allow_null=True, allow_blank=True)
+
+    def validate_product_name(self, value):
+        return value
+
+    def validate_article_number(self, value):
+        return value or None
@@ -0,0 +1,157 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import search
+from .images import delete_variants
+from .jobs import enqueue_image, needs_processing
+from .cache import bump_catalog_version
+from .colors import forget_color_ids
+from .counters import adjust_counts, move_type_counts
+from .models import Category, Type, Product, ProductImage, ProductColor
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if not raw and search.search_available():
+        search.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_index(sender, instance, **kwargs):
+    if search.search_available():
+        search.remove_product(instance.pk)
+
+
+def invalidate_catalog():
+    # После коммита, иначе параллельный запрос успеет закешировать старые данные под новой версией
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Type)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Type)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=ProductColor)
+def invalidate_catalog_on_change(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(m2m_changed, sender=Product.colors.through)
+def invalidate_catalog_on_colors_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_catalog()
+
+
+def touch_products(product_ids):
+    """Изображения и цвета входят в представление продукта, поэтому сдвигаем его updated_at (ETag, Last-Modified)"""
+    Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def touch_product_on_image_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        touch_products([instance.product_id])
+
+
+@receiver(m2m_changed, sender=Product.colors.through)
+def touch_products_on_colors_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        touch_products(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear' and not reverse:
+        touch_products([instance.pk])
+    elif action == 'pre_clear' and reverse:
+        touch_products(instance.product_set.values('pk'))
+
+
+@receiver(post_save, sender=ProductColor)
+@receiver(pre_delete, sender=ProductColor)
+def touch_products_on_color_edit(sender, instance, raw=False, **kwargs):
+    # Изменение значения цвета меняет представление всех продуктов с ним; при удалении
+    # строки связей удаляются каскадом без m2m_changed, поэтому — до удаления
+    if not raw and instance.pk:
+        touch_products(instance.product_set.values('pk'))
+
+
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=ProductColor)
+def forget_cached_color_ids(sender, **kwargs):
+    # Кеш id цветов (ProductColor.objects.resolve): значение изменилось или id больше нет
+    forget_color_ids()
+
+
+# Счётчики продуктов типов и категорий (core/counters.py). Значения, с которыми объект
+# загружен, запоминаются без запроса; отложенные (only/defer) поля читаются перед сохранением
+# и удалением.
+
+@receiver(post_init, sender=Product)
+def remember_product_counted(sender, instance, **kwargs):
+    instance._counted = (instance.__dict__.get('type_id'), instance.__dict__.get('in_stock'))
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_delete, sender=Product)
+def load_product_counted(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding and None in instance._counted:
+        instance._counted = Product.objects.filter(pk=instance.pk).values_list('type_id', 'in_stock').get()
+
+
+@receiver(post_save, sender=Product)
+def count_saved_product(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    type_id, in_stock = instance.type_id, instance.in_stock
+    if created:
+        adjust_counts(type_id, 1, int(in_stock))
+    else:
+        old_type_id, old_in_stock = instance._counted
+        # save(update_fields=...) записал только перечисленные поля
+        if update_fields is not None:
+            if not {'type', 'type_id'} & update_fields:
+                type_id = old_type_id
+            if 'in_stock' not in update_fields:
+                in_stock = old_in_stock
+        if old_type_id != type_id:
+            adjust_counts(old_type_id, -1, -int(old_in_stock))
+            adjust_counts(type_id, 1, int(in_stock))
+        elif old_in_stock != in_stock:
+            adjust_counts(type_id, 0, int(in_stock) - int(old_in_stock))
+    instance._counted = (type_id, in_stock)
+
+
+@receiver(post_delete, sender=Product)
+def count_deleted_product(sender, instance, **kwargs):
+    type_id, in_stock = instance._counted
+    adjust_counts(type_id, -1, -int(in_stock))
+
+
+@receiver(post_init, sender=Type)
+def remember_type_category(sender, instance, **kwargs):
+    instance._counted_category_id = instance.__dict__.get('category_id')
+
+
+@receiver(post_save, sender=Type)
+def move_counts_with_type(sender, instance, created, raw=False, **kwargs):
+    old_category_id = instance._counted_category_id
+    if not raw and not created and old_category_id is not None and old_category_id != instance.category_id:
+        move_type_counts(instance.pk, old_category_id, instance.category_id)
+    instance._counted_category_id = instance.category_id
+
+
+@receiver(post_save, sender=ProductImage)
+def enqueue_image_processing(sender, instance, raw=False, **kwargs):
+    # Производные создаёт manage.py run_image_worker, запрос загрузки их не ждёт
+    if not raw and needs_processing(instance):
+        enqueue_image(instance)
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_image_variants(sender, instance, **kwargs):
+    delete_variants(instance)
@@ -1,20 +1,32 @@
+from django.conf import settings
 from django.urls import path
+from .async_views import ASYNC_VIEWS
 from .views import (
     CategoryListCreateView, CategoryDetailView,
     TypeListCreateView, TypeDetailView,
-    ProductListCreateView, ProductDetailView, ObtainAuthTokenView,
+    ProductListCreateView, ProductDetailView, ProductFacetsView, ProductBulkView, ObtainAuthTokenView,
     ProductImageListCreateView, ProductImageDetailView
 )
 
+
+def catalog_view(view):
+    """Под ASGI с ASYNC_CATALOG_VIEWS чтение каталога идёт через core/async_views.py"""
+    if settings.ASYNC_CATALOG_VIEWS:
+        return ASYNC_VIEWS[view].as_view()
+    return view.as_view()
+
+
 urlpatterns = [
     path('token/', ObtainAuthTokenView.as_view(), name='obtain_token'),
 
-    path('categories/', CategoryListCreateView.as_view(), name='category-list'),
-    path('categories/<int:pk>/', CategoryDetailView.as_view(), name='category-detail'),
-    path('types/', TypeListCreateView.as_view(), name='type-list'),
-    path('types/<int:pk>/', TypeDetailView.as_view(), name='type-detail'),
-    path('products/', ProductListCreateView.as_view(), name='product-list'),
-    path('products/<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
-    path('product-images/', ProductImageListCreateView.as_view(), name='product-image-list'),
-    path('product-images/<int:pk>/', ProductImageDetailView.as_view(), name='product-image-detail'),
+    path('categories/', catalog_view(CategoryListCreateView), name='category-list'),
+    path('categories/<int:pk>/', catalog_view(CategoryDetailView), name='category-detail'),
+    path('types/', catalog_view(TypeListCreateView), name='type-list'),
+    path('types/<int:pk>/', catalog_view(TypeDetailView), name='type-detail'),
+    path('products/', catalog_view(ProductListCreateView), name='product-list'),
+    path('products/facets/', ProductFacetsView.as_view(), name='product-facets'),
+    path('products/bulk/', ProductBulkView.as_view(), name='product-bulk'),
+    path('products/<int:pk>/', catalog_view(ProductDetailView), name='product-detail'),
+    path('product-images/', catalog_view(ProductImageListCreateView), name='product-image-list'),
+    path('product-images/<int:pk>/', catalog_view(ProductImageDetailView), name='product-image-detail'),
 ]
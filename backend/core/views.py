@@ -3,13 +3,25 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.http import Http404
 from .models import Category, Type, Product, ProductImage
-from .serializers import CategorySerializer, TypeSerializer, ProductSerializer, ProductImageSerializer
+from .serializers import (
+    CategorySerializer, TypeSerializer, ProductSerializer, ProductImageSerializer, product_representation
+)
+from .pagination import (
+    KeysetPaginator, InvalidCursor, page_size_param, numbered_page, cursor_data, page_data, wants_count
+)
+from .representation import FastProductSerializer
+from . import bulk
+from .filters import filter_products, sort_products, ProductFilterError
+from .facets import product_facets
+from .cache import CatalogCacheMixin
+from .conditional import compute_validators, conditional_response, set_validators, validators_for
+from .engine import page_rows, select_products
+from .db import read_database
 from django.db.models import Q
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import AllowAny
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.utils.dateparse import parse_datetime
+from django.core.paginator import Paginator
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
@@ -28,14 +40,18 @@ class ObtainAuthTokenView(APIView):
 
 
 # Category API (без изменений)
-class CategoryListCreateView(APIView):
+class CategoryListCreateView(CatalogCacheMixin, APIView):
     def get(self, request):
-        categories = Category.objects.all()
+        categories = Category.objects.using(read_database())
+        validators = compute_validators(request, categories)
+        not_modified = conditional_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
         serializer = CategorySerializer(categories, many=True)
-        return Response({"count": len(serializer.data), "results": serializer.data})
+        return set_validators(Response({"count": len(serializer.data), "results": serializer.data}), validators)
 
     def post(self, request):
-        print(request.headers)
         if not request.user.is_authenticated:
             return Response({"detail": "Authentication credentials were not provided."},
                             status=status.HTTP_401_UNAUTHORIZED)
@@ -47,17 +63,26 @@ class CategoryListCreateView(APIView):
         return Response({"error": "Invalid data", "details": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CategoryDetailView(APIView):
-    def get_object(self, pk):
+class CategoryDetailView(CatalogCacheMixin, APIView):
+    def get_object(self, pk, using=None):
         try:
-            return Category.objects.get(pk=pk)
+            return Category.objects.using(using).get(pk=pk)
         except Category.DoesNotExist:
             raise Http404("Category not found")
 
     def get(self, request, pk):
-        category = self.get_object(pk)
+        database = read_database()
+        validators = compute_validators(request, Category.objects.using(database).filter(pk=pk))
+        # Без строки нет и представления: 404, а не 304 по ETag пустого queryset
+        if not validators.count:
+            raise Http404("Category not found")
+        not_modified = conditional_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        category = self.get_object(pk, using=database)
         serializer = CategorySerializer(category)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), validators)
 
     def put(self, request, pk):
         category = self.get_object(pk)
@@ -74,21 +99,27 @@ class CategoryDetailView(APIView):
 
 
 # Type API (добавляем фильтрацию по категории)
-class TypeListCreateView(APIView):
+class TypeListCreateView(CatalogCacheMixin, APIView):
     def get(self, request):
-        types = Type.objects.all()
+        types = Type.objects.using(read_database()).select_related('category')
         category_id = request.query_params.get('category', None)
         if category_id:
             try:
                 types = types.filter(category__id=category_id)
             except ValueError:
                 return Response({"error": "Invalid category ID"}, status=status.HTTP_400_BAD_REQUEST)
+
+        validators = compute_validators(request, types)
+        not_modified = conditional_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
         serializer = TypeSerializer(types, many=True)
-        return Response({
+        return set_validators(Response({
             "count": len(serializer.data),
             "category_id": category_id if category_id else "All",
             "results": serializer.data
-        })
+        }), validators)
 
     def post(self, request):
         serializer = TypeSerializer(data=request.data)
@@ -98,17 +129,26 @@ class TypeListCreateView(APIView):
         return Response({"error": "Invalid data", "details": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class TypeDetailView(APIView):
-    def get_object(self, pk):
+class TypeDetailView(CatalogCacheMixin, APIView):
+    def get_object(self, pk, using=None):
         try:
-            return Type.objects.get(pk=pk)
+            return Type.objects.using(using).select_related('category').get(pk=pk)
         except Type.DoesNotExist:
             raise Http404("Type not found")
 
     def get(self, request, pk):
-        type_obj = self.get_object(pk)
+        database = read_database()
+        validators = compute_validators(request, Type.objects.using(database).filter(pk=pk))
+        # Без строки нет и представления: 404, а не 304 по ETag пустого queryset
+        if not validators.count:
+            raise Http404("Type not found")
+        not_modified = conditional_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        type_obj = self.get_object(pk, using=database)
         serializer = TypeSerializer(type_obj)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), validators)
 
     def put(self, request, pk):
         type_obj = self.get_object(pk)
@@ -124,7 +164,10 @@ class TypeDetailView(APIView):
         return Response({"message": "Type deleted"}, status=status.HTTP_204_NO_CONTENT)
 
 
-class ProductListCreateView(APIView):
+class ProductListCreateView(CatalogCacheMixin, APIView):
+    # GET через словари из .values() (core/representation.py) вместо ProductSerializer
+    fast_read = True
+
     @swagger_auto_schema(
         operation_id='list_products',
         operation_summary='Получить список продуктов с фильтрацией, сортировкой и пагинацией',
@@ -134,6 +177,12 @@ class ProductListCreateView(APIView):
                               type=openapi.TYPE_INTEGER, required=True),
             openapi.Parameter('category', openapi.IN_QUERY, description="ID категории",
                               type=openapi.TYPE_INTEGER),
+            openapi.Parameter('q', openapi.IN_QUERY,
+                              description="Полнотекстовый поиск по префиксам слов в названии, стандарте горла, "
+                                          "габаритах, составе, материале, упаковке, применении и описании. "
+                                          "Без sort результаты упорядочены по релевантности; "
+                                          "режим курсора с q требует sort",
+                              type=openapi.TYPE_STRING),
             openapi.Parameter('name', openapi.IN_QUERY, description="Поиск по названию (частичное совпадение)",
                               type=openapi.TYPE_STRING),
             openapi.Parameter('throat_standard', openapi.IN_QUERY, description="Стандарт горла (частичное совпадение)",
@@ -156,6 +205,8 @@ class ProductListCreateView(APIView):
                               type=openapi.TYPE_STRING),
             openapi.Parameter('color', openapi.IN_QUERY, description="Цвет (например, #FFFFFF)",
                               type=openapi.TYPE_STRING),
+            openapi.Parameter('in_stock', openapi.IN_QUERY, description="В наличии (true/false)",
+                              type=openapi.TYPE_BOOLEAN),
             openapi.Parameter('material', openapi.IN_QUERY, description="Материал (частичное совпадение)",
                               type=openapi.TYPE_STRING),
             openapi.Parameter('package', openapi.IN_QUERY, description="Упаковка (частичное совпадение)",
@@ -189,6 +240,24 @@ class ProductListCreateView(APIView):
                               type=openapi.TYPE_INTEGER, default=1),
             openapi.Parameter('page_size', openapi.IN_QUERY, description="Размер страницы",
                               type=openapi.TYPE_INTEGER, default=10),
+            openapi.Parameter('cursor', openapi.IN_QUERY,
+                              description="Курсор следующей страницы (next_cursor). Пустое значение — первая "
+                                          "страница в режиме курсора, параметр page при этом не используется. "
+                                          "Вместе с q нужен sort: порядок по релевантности курсор не поддерживает",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('view', openapi.IN_QUERY,
+                              description="full — все поля (по умолчанию), compact — id, название, объём, "
+                                          "наличие и первое изображение",
+                              type=openapi.TYPE_STRING, enum=['full', 'compact']),
+            openapi.Parameter('fields', openapi.IN_QUERY,
+                              description="Только перечисленные через запятую поля, например id,product_name,images",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('expand', openapi.IN_QUERY,
+                              description="Поля в дополнение к набору по умолчанию, например type,colors",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('with_count', openapi.IN_QUERY,
+                              description="В режиме курсора: вернуть count и total_pages (дополнительный COUNT)",
+                              type=openapi.TYPE_BOOLEAN, default=False),
         ],
         responses={
             200: openapi.Response('Список продуктов', ProductSerializer(many=True)),
@@ -198,189 +267,60 @@ class ProductListCreateView(APIView):
         security=[{'TokenAuth': []}]
     )
     def get(self, request):
-        products = Product.objects.all()
-
-        # Фильтрация по типу (обязательный параметр)
-        type_id = request.query_params.get('type', None)
-        if type_id:
-            try:
-                products = products.filter(type_id=type_id)
-            except ValueError:
-                return Response({"error": "Invalid type ID"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Фильтрация по категории через связь type__category
-        category_id = request.query_params.get('category', None)
-        if category_id:
-            try:
-                products = products.filter(type__category_id=category_id)
-            except ValueError:
-                return Response({"error": "Invalid category ID"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Оставшаяся логика фильтрации остаётся без изменений
-        name = request.query_params.get('name', None)
-        if name:
-            products = products.filter(product_name__icontains=name)
-
-        throat_standard = request.query_params.get('throat_standard', None)
-        if throat_standard:
-            products = products.filter(throat_standard__icontains=throat_standard)
-
-        throat_diameter = request.query_params.get('throat_diameter', None)
-        if throat_diameter:
-            try:
-                products = products.filter(throat_diameter=int(throat_diameter))
-            except ValueError:
-                return Response({"error": "Invalid throat_diameter value"}, status=status.HTTP_400_BAD_REQUEST)
-
-        throat_diameter_min = request.query_params.get('throat_diameter_min', None)
-        throat_diameter_max = request.query_params.get('throat_diameter_max', None)
-        if throat_diameter_min:
-            try:
-                products = products.filter(throat_diameter__gte=int(throat_diameter_min))
-            except ValueError:
-                return Response({"error": "Invalid throat_diameter_min value"}, status=status.HTTP_400_BAD_REQUEST)
-        if throat_diameter_max:
-            try:
-                products = products.filter(throat_diameter__lte=int(throat_diameter_max))
-            except ValueError:
-                return Response({"error": "Invalid throat_diameter_max value"}, status=status.HTTP_400_BAD_REQUEST)
-
-        volume = request.query_params.get('volume', None)
-        if volume:
-            try:
-                products = products.filter(package_volume=int(volume))
-            except ValueError:
-                return Response({"error": "Invalid volume value"}, status=status.HTTP_400_BAD_REQUEST)
-
-        volume_min = request.query_params.get('volume_min', None)
-        volume_max = request.query_params.get('volume_max', None)
-        if volume_min:
-            try:
-                products = products.filter(package_volume__gte=int(volume_min))
-            except ValueError:
-                return Response({"error": "Invalid volume_min value"}, status=status.HTTP_400_BAD_REQUEST)
-        if volume_max:
-            try:
-                products = products.filter(package_volume__lte=int(volume_max))
-            except ValueError:
-                return Response({"error": "Invalid volume_max value"}, status=status.HTTP_400_BAD_REQUEST)
-
-        dimensions = request.query_params.get('dimensions', None)
-        if dimensions:
-            products = products.filter(dimensions__icontains=dimensions)
-
-        compound = request.query_params.get('compound', None)
-        if compound:
-            products = products.filter(compound__icontains=compound)
-
-        color = request.query_params.get('color', None)
-        if color:
-            products = products.filter(basic_lighting_solution=color)
-
-        material = request.query_params.get('material', None)
-        if material:
-            products = products.filter(material__icontains=material)
-
-        package = request.query_params.get('package', None)
-        if package:
-            products = products.filter(package__icontains=package)
-
-        weight = request.query_params.get('weight', None)
-        if weight:
-            try:
-                products = products.filter(weight=int(weight))
-            except ValueError:
-                return Response({"error": "Invalid weight value"}, status=status.HTTP_400_BAD_REQUEST)
-
-        weight_min = request.query_params.get('weight_min', None)
-        weight_max = request.query_params.get('weight_max', None)
-        if weight_min:
-            try:
-                products = products.filter(weight__gte=int(weight_min))
-            except ValueError:
-                return Response({"error": "Invalid weight_min value"}, status=status.HTTP_400_BAD_REQUEST)
-        if weight_max:
-            try:
-                products = products.filter(weight__lte=int(weight_max))
-            except ValueError:
-                return Response({"error": "Invalid weight_max value"}, status=status.HTTP_400_BAD_REQUEST)
-
-        application = request.query_params.get('application', None)
-        if application:
-            products = products.filter(application__icontains=application)
-
-        description = request.query_params.get('description', None)
-        if description:
-            products = products.filter(description__icontains=description)
-
-        created_at_min = request.query_params.get('created_at_min', None)
-        created_at_max = request.query_params.get('created_at_max', None)
-        if created_at_min:
-            try:
-                created_at_min_dt = parse_datetime(created_at_min)
-                products = products.filter(created_at__gte=created_at_min_dt)
-            except ValueError:
-                return Response({"error": "Invalid created_at_min format"}, status=status.HTTP_400_BAD_REQUEST)
-        if created_at_max:
-            try:
-                created_at_max_dt = parse_datetime(created_at_max)
-                products = products.filter(created_at__lte=created_at_max_dt)
-            except ValueError:
-                return Response({"error": "Invalid created_at_max format"}, status=status.HTTP_400_BAD_REQUEST)
-
-        updated_at_min = request.query_params.get('updated_at_min', None)
-        updated_at_max = request.query_params.get('updated_at_max', None)
-        if updated_at_min:
-            try:
-                updated_at_min_dt = parse_datetime(updated_at_min)
-                products = products.filter(updated_at__gte=updated_at_min_dt)
-            except ValueError:
-                return Response({"error": "Invalid updated_at_min format"}, status=status.HTTP_400_BAD_REQUEST)
-        if updated_at_max:
-            try:
-                updated_at_max_dt = parse_datetime(updated_at_max)
-                products = products.filter(updated_at__lte=updated_at_max_dt)
-            except ValueError:
-                return Response({"error": "Invalid updated_at_max format"}, status=status.HTTP_400_BAD_REQUEST)
-
-        sort_by = request.query_params.get('sort', None)
-        if sort_by:
-            if sort_by in ['product_name', 'package_volume', 'created_at', 'updated_at', 'throat_diameter', 'weight']:
-                order = request.query_params.get('order', 'asc')
-                if order == 'desc':
-                    sort_by = f'-{sort_by}'
-                products = products.order_by(sort_by)
-            else:
-                return Response({"error": "Invalid sort field"}, status=status.HTTP_400_BAD_REQUEST)
-
-        page_size = request.query_params.get('page_size', 10)
         try:
-            page_size = int(page_size)
-            if page_size <= 0:
-                page_size = 10
-        except ValueError:
-            page_size = 10
+            serializer_class, fields = product_representation(request.query_params)
+            sort_field = request.query_params.get('sort') or 'id'
+            database = read_database()
+            if self.fast_read:
+                fast = FastProductSerializer(serializer_class, fields, encoded=True, using=database)
+                products = Product.objects.using(database)
+            else:
+                # Поле сортировки нужно пагинатору курсора, загружаем его даже если его нет в ответе
+                products = Product.objects.using(database).for_read(
+                    fields if fields is None else fields | {sort_field})
+            products = sort_products(filter_products(products, request.query_params), request.query_params)
+        except ProductFilterError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Движок каталога в памяти (CATALOG_ENGINE): id страницы без SQL, из базы — только её строки
+        selection = select_products(request.query_params, database) if self.fast_read else None
+        if selection is not None:
+            validators = validators_for(request, Product, selection.state)
+        else:
+            validators = compute_validators(request, products)
+        not_modified = conditional_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        if self.fast_read:
+            products = fast.values(products, extra=[sort_field])
+
+        def serialize(objects):
+            if selection is not None:
+                return fast.serialize(page_rows(fast, objects.object_list, database, extra=[sort_field]))
+            if self.fast_read:
+                return fast.serialize(objects)
+            return serializer_class(objects, many=True, fields=fields).data
+
+        params = request.query_params
+        page_size = page_size_param(params)
+
+        # Режим курсора: страница по ключу (sort, id) без OFFSET и, по умолчанию, без COUNT(*)
+        if 'cursor' in params:
+            paginator = KeysetPaginator(products, page_size, sort_field=sort_field,
+                                        descending=params.get('order', 'asc') == 'desc')
+            try:
+                page_objects, next_cursor = paginator.page(params.get('cursor'))
+            except InvalidCursor:
+                return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
 
-        paginator = Paginator(products, page_size)
-        page = request.query_params.get('page', 1)
+            count = products.count() if wants_count(params) else None
+            data = cursor_data(params, next_cursor, serialize(page_objects), count, page_size)
+            return set_validators(Response(data), validators)
 
-        try:
-            page_objects = paginator.page(page)
-        except PageNotAnInteger:
-            page_objects = paginator.page(1)
-        except EmptyPage:
-            page_objects = paginator.page(paginator.num_pages)
-
-        serializer = ProductSerializer(page_objects, many=True)
-        return Response({
-            "count": paginator.count,
-            "total_pages": paginator.num_pages,
-            "current_page": page_objects.number,
-            "next": page_objects.has_next(),
-            "previous": page_objects.has_previous(),
-            "type_id": type_id if type_id else "All",
-            "results": serializer.data
-        })
+        paginator = Paginator(products if selection is None else selection.ids, page_size)
+        page_objects = numbered_page(paginator, params.get('page', 1))
+        return set_validators(Response(page_data(params, page_objects, serialize(page_objects))), validators)
 
     @swagger_auto_schema(
         operation_id='create_product',
@@ -409,10 +349,107 @@ class ProductListCreateView(APIView):
                         status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProductDetailView(APIView):
-    def get_object(self, pk):
+class ProductFacetsView(CatalogCacheMixin, APIView):
+    @swagger_auto_schema(
+        operation_id='product_facets',
+        operation_summary='Количество продуктов по значениям фильтров',
+        operation_description='Принимает те же фильтры, что и список продуктов. Для каждой группы '
+                              '(категория, тип, объём, диаметр горла, цвет, наличие) возвращает количество '
+                              'продуктов по каждому значению; собственный фильтр группы при этом не учитывается.',
+        responses={
+            200: openapi.Response('Счётчики по группам', openapi.Schema(type='object', properties={
+                'count': {'type': 'integer'}, 'facets': {'type': 'object'}})),
+            400: openapi.Response('Неверный параметр фильтра',
+                                  openapi.Schema(type='object', properties={'error': {'type': 'string'}}))
+        }
+    )
+    def get(self, request):
         try:
-            return Product.objects.get(pk=pk)
+            data = product_facets(request.query_params, using=read_database())
+        except ProductFilterError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
+class ProductBulkView(APIView):
+    @swagger_auto_schema(
+        operation_id='bulk_products',
+        operation_summary='Пакетное создание, изменение и удаление продуктов',
+        operation_description='Проверяет все операции набором общих запросов и выполняет их в одной транзакции. '
+                              'Если хотя бы одна операция неверна, ничего не применяется.\n\n'
+                              'Вместо operations можно передать action — одно изменение для списка ids '
+                              '(set_colors, add_colors, remove_colors с colors; set_type с type_id; '
+                              'set_in_stock с in_stock), выполняется несколькими запросами на весь список.',
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'action': openapi.Schema(type=openapi.TYPE_STRING, enum=list(bulk.ACTIONS)),
+                'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                                      description='ID продуктов для action'),
+                'colors': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
+                'type_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'in_stock': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                'operations': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'op': openapi.Schema(type=openapi.TYPE_STRING, enum=list(bulk.OPERATIONS)),
+                        'id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID продукта (update, delete)'),
+                        'data': openapi.Schema(type=openapi.TYPE_OBJECT, description='Поля продукта (create, update)'),
+                    }
+                )),
+            }
+        ),
+        responses={
+            200: openapi.Response('Результаты по каждой операции или число изменённых продуктов для action',
+                                  openapi.Schema(type='object', properties={
+                                      'results': {'type': 'array', 'items': {'type': 'object'}},
+                                      'action': {'type': 'string'}, 'updated': {'type': 'integer'}})),
+            400: openapi.Response('Неверные данные', openapi.Schema(type='object', properties={
+                'error': {'type': 'string'}, 'results': {'type': 'array', 'items': {'type': 'object'}}})),
+            401: openapi.Response('Требуется аутентификация',
+                                  openapi.Schema(type='object', properties={'detail': {'type': 'string'}}))
+        },
+        security=[{'TokenAuth': []}]
+    )
+    def post(self, request):
+        if not request.user.is_authenticated:
+            return Response({"detail": "Authentication credentials were not provided."},
+                            status=status.HTTP_401_UNAUTHORIZED)
+
+        if isinstance(request.data, dict) and 'action' in request.data:
+            parsed = bulk.parse_action(request.data)
+            if isinstance(parsed, str):
+                return Response({"error": parsed}, status=status.HTTP_400_BAD_REQUEST)
+            function, ids, value = parsed
+            updated = function(Product.objects.filter(pk__in=ids), value)
+            return Response({"action": request.data['action'], "updated": updated})
+
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return Response({"error": "Field 'operations' must be a non-empty list"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > bulk.MAX_OPERATIONS:
+            return Response({"error": f"Too many operations, maximum is {bulk.MAX_OPERATIONS}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        items, errors = bulk.validate_operations(operations)
+        if errors:
+            return Response({"error": "Invalid data", "results": [
+                {"index": index, "status": "error", "details": errors[index]} if index in errors
+                else {"index": index, "status": "valid"}
+                for index in range(len(operations))
+            ]}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk.apply_operations(items)
+        return Response({"results": [{"index": index, **results[index]} for index in range(len(operations))]})
+
+
+class ProductDetailView(CatalogCacheMixin, APIView):
+    fast_read = True
+
+    def get_object(self, pk, fields=None, using=None):
+        try:
+            return Product.objects.using(using).for_read(fields).get(pk=pk)
         except Product.DoesNotExist:
             raise Http404("Product not found")
 
@@ -420,9 +457,29 @@ class ProductDetailView(APIView):
         responses={200: ProductSerializer, 404: 'Продукт не найден'}
     )
     def get(self, request, pk):
-        product = self.get_object(pk)
-        serializer = ProductSerializer(product)
-        return Response(serializer.data)
+        database = read_database()
+        validators = compute_validators(request, Product.objects.using(database).filter(pk=pk))
+        # Без строки нет и представления: 404, а не 304 по ETag пустого queryset
+        if not validators.count:
+            raise Http404("Product not found")
+        not_modified = conditional_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        try:
+            serializer_class, fields = product_representation(request.query_params)
+        except ProductFilterError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        if self.fast_read:
+            fast = FastProductSerializer(serializer_class, fields, encoded=True, using=database)
+            rows = fast.serialize(fast.values(Product.objects.using(database).filter(pk=pk)))
+            if not rows:
+                raise Http404("Product not found")
+            return set_validators(Response(rows[0]), validators)
+
+        product = self.get_object(pk, fields, using=database)
+        serializer = serializer_class(product, fields=fields)
+        return set_validators(Response(serializer.data), validators)
 
     @swagger_auto_schema(
         request_body=ProductSerializer,
@@ -472,10 +529,9 @@ class ProductImageListCreateView(APIView):
         """Получить список изображений продуктов с фильтрацией по ID продукта."""
         product_id = request.query_params.get('product', None)
         
+        images = ProductImage.objects.using(read_database())
         if product_id:
-            images = ProductImage.objects.filter(product_id=product_id)
-        else:
-            images = ProductImage.objects.all()
+            images = images.filter(product_id=product_id)
             
         serializer = ProductImageSerializer(images, many=True)
         return Response(serializer.data)
@@ -508,8 +564,6 @@ class ProductImageListCreateView(APIView):
             return Response({"detail": "Authentication credentials were not provided."},
                             status=status.HTTP_401_UNAUTHORIZED)
         
-        print(f"Получен запрос на загрузку изображения: {request.data}")
-        
         # Проверяем, что product_id указан и существует
         product_id = request.data.get('product')
         if not product_id:
@@ -531,6 +585,7 @@ class ProductImageListCreateView(APIView):
         })
         
         if serializer.is_valid():
+            # Производные создаются в фоне (run_image_worker), в ответе status='pending'
             serializer.save(product=product)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
@@ -539,10 +594,10 @@ class ProductImageListCreateView(APIView):
 
 
 class ProductImageDetailView(APIView):
-    def get_object(self, pk):
+    def get_object(self, pk, using=None):
         """Получить объект изображения по ID или вернуть 404."""
         try:
-            return ProductImage.objects.get(pk=pk)
+            return ProductImage.objects.using(using).get(pk=pk)
         except ProductImage.DoesNotExist:
             raise Http404("Product image not found")
 
@@ -557,7 +612,7 @@ class ProductImageDetailView(APIView):
     )
     def get(self, request, pk):
         """Получить информацию о конкретном изображении продукта."""
-        image = self.get_object(pk)
+        image = self.get_object(pk, using=read_database())
         serializer = ProductImageSerializer(image)
         return Response(serializer.data)
 
@@ -16,6 +16,7 @@ const TypeSelector = ({ types, activeType, onSelectType }) => {
             }`}
           >
             {type.name}
+            {type.count !== undefined && <span className="ml-1 text-gray-400">({type.count})</span>}
           </motion.button>
         </li>
       ))}
@@ -41,7 +41,7 @@ const CatalogPage = () => {
                     ...category,
                     types: typeData
                         .filter((type) => type.category.id === category.id)
-                        .map((type) => ({ id: type.id, name: type.type_name })),
+                        .map((type) => ({ id: type.id, name: type.type_name, count: type.product_count })),
                 }));
 
                 setCategories(enrichedCategories);
@@ -255,6 +255,17 @@ export const fetchProductsByType = async (typeId, page = 1, limit = 12) => {
     }
 };
 
+// Количество продуктов по значениям фильтров (категории, типы, объём, горло, цвет, наличие)
+export const fetchProductFacets = async (params = {}) => {
+  try {
+    const response = await api.get('/products/facets/', { params });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching product facets:', error);
+    throw error;
+  }
+};
+
 export const fetchProductById = async (productId) => {
     try {
         const response = await api.get(`/products/${productId}/`);